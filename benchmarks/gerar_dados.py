@@ -0,0 +1,102 @@
+"""Gera planilhas sintéticas de faturamento no mesmo formato da planilha real.
+
+As colunas e os formatos seguem a planilha do Google Sheets (datas DD/MM/YYYY, valores
+"R$ 1.234,56", "Data _Vencimento" com espaço, aliases de Carteira, textos livres em Dia e
+Prazo), incluindo células vazias e valores inválidos nas mesmas situações em que aparecem
+na planilha de verdade. Tudo é gerado de forma vetorizada, então 1 milhão de linhas leva
+poucos segundos.
+
+Uso:
+    python benchmarks/gerar_dados.py --linhas 100000 --saida dados_100k.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from formatacao import formatar_moeda
+
+RESTAURANTES = [f"Restaurante {i:02d}" for i in range(1, 41)]
+CLIENTES = [f"Cliente {i:03d} - Unidade {u}" for i in range(1, 121) for u in 'AB']
+CARTEIRAS = ['Boleto', 'Pix', 'Transferência Bancária', 'Depósito em Conta', 'Deposito em Conta',
+             'DEPÓSITO EM CONTA', 'Sem Funcionamento', None]
+PESOS_CARTEIRA = [0.35, 0.2, 0.15, 0.1, 0.03, 0.02, 0.05, 0.1]
+PRAZOS = ['30 dias', '28 dias', '15 dias', '45 dias', '7', 'Antecipado', None]
+PESOS_PRAZO = [0.4, 0.15, 0.15, 0.1, 0.05, 0.05, 0.1]
+DIAS = ['10', '15', '20', '25', '30', 'dia 5', '0', 'Segunda-feira', 'Quarta', 'Sexta-feira',
+        'Antecipado', 'Não Informado', None]
+PESOS_DIA = [0.15, 0.15, 0.1, 0.1, 0.1, 0.05, 0.1, 0.05, 0.03, 0.05, 0.05, 0.02, 0.05]
+
+
+def formatar_datas(datas, vazias):
+    # Poucas datas distintas: formata cada uma uma vez e distribui pelas linhas
+    unicas, posicoes = np.unique(datas, return_inverse=True)
+    texto = pd.Series(pd.DatetimeIndex(unicas).strftime('%d/%m/%Y').to_numpy(dtype=object)[posicoes])
+    texto[vazias] = None
+    return texto
+
+
+def formatar_valores(centavos, rng):
+    # "R$ 1.234,56" na maioria das linhas, com as variações que aparecem na planilha
+    texto = formatar_moeda(pd.Series(centavos / 100))
+    sorteio = rng.random(len(centavos))
+    sem_simbolo = texto.str.slice(3).str.replace('.', '', regex=False)
+    texto = texto.where(sorteio >= 0.05, sem_simbolo).astype(object)
+    texto[(sorteio >= 0.05) & (sorteio < 0.08)] = None
+    texto[(sorteio >= 0.08) & (sorteio < 0.085)] = 'a confirmar'
+    return texto
+
+
+def gerar_planilha(linhas, semente=0, inicio='2022-01-01', meses=36):
+    rng = np.random.default_rng(semente)
+    base = np.datetime64(inicio, 'D')
+
+    inicio_medicao = base + rng.integers(0, meses * 30, linhas).astype('timedelta64[D]')
+    fim_medicao = inicio_medicao + rng.integers(6, 31, linhas).astype('timedelta64[D]')
+    faturamento = fim_medicao + rng.integers(0, 16, linhas).astype('timedelta64[D]')
+    vencimento = faturamento + rng.choice([7, 15, 28, 30, 30, 30, 45], linhas).astype('timedelta64[D]')
+    # Medições mais recentes ainda sem faturamento/vencimento preenchidos
+    ultimo_dia = base + np.timedelta64(meses * 30, 'D')
+    sem_faturamento = (fim_medicao > ultimo_dia - 20) | (rng.random(linhas) < 0.05)
+    sem_vencimento = sem_faturamento | (rng.random(linhas) < 0.03)
+
+    centavos = np.round(rng.lognormal(mean=11.5, sigma=1.0, size=linhas)).astype('int64')
+
+    df = pd.DataFrame({
+        'Restaurante': rng.choice(RESTAURANTES, linhas),
+        'Cliente': rng.choice(CLIENTES, linhas),
+        'Inicio_Medição': formatar_datas(inicio_medicao, rng.random(linhas) < 0.02),
+        'Fim_Medição': formatar_datas(fim_medicao, rng.random(linhas) < 0.02),
+        'Período_Medição': rng.choice(['Mensal', 'Quinzenal', 'Semanal'], linhas, p=[0.7, 0.2, 0.1]),
+        'Data_Faturamento': formatar_datas(faturamento, sem_faturamento),
+        'Data _Vencimento': formatar_datas(vencimento, sem_vencimento),
+        'Prazo': rng.choice(np.array(PRAZOS, dtype=object), linhas, p=PESOS_PRAZO),
+        'Dia': rng.choice(np.array(DIAS, dtype=object), linhas, p=PESOS_DIA),
+        'Valor_Faturamento': formatar_valores(centavos, rng),
+        'Carteira': rng.choice(np.array(CARTEIRAS, dtype=object), linhas, p=PESOS_CARTEIRA),
+        'Medição_Encerrada': rng.choice(np.array(['OK', 'Não', None], dtype=object), linhas, p=[0.6, 0.3, 0.1]),
+        'Validação_Cliente': rng.choice(np.array(['Sim', 'Não', None], dtype=object), linhas, p=[0.7, 0.2, 0.1]),
+    })
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=10_000, help='número de linhas (padrão: 10000)')
+    parser.add_argument('--semente', type=int, default=0, help='semente do gerador aleatório (padrão: 0)')
+    parser.add_argument('--saida', required=True, help='arquivo de saída (.csv ou .parquet)')
+    args = parser.parse_args()
+
+    df = gerar_planilha(args.linhas, args.semente)
+    if args.saida.lower().endswith('.parquet'):
+        df.to_parquet(args.saida, index=False)
+    else:
+        df.to_csv(args.saida, index=False)
+    print(f"{args.saida}: {len(df)} linha(s)")
+
+
+if __name__ == '__main__':
+    main()
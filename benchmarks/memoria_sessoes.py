@@ -0,0 +1,86 @@
+"""Mede a memória do processo com N sessões simultâneas do painel.
+
+Cada sessão é um AppTest do Streamlit rodando o dashboard.py completo no mesmo processo,
+como acontece no servidor: os caches (st.cache_resource) são compartilhados e o estado de
+cada sessão fica vivo até o fim da medição. Metade das sessões aplica um filtro de
+restaurante, para incluir os recortes por sessão na conta.
+
+Uso:
+    python benchmarks/memoria_sessoes.py --fonte dados.csv --sessoes 30
+    python benchmarks/memoria_sessoes.py --linhas 200000 --sessoes 30   (planilha sintética)
+"""
+import argparse
+import gc
+import os
+import resource
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memoria_mb():
+    # RSS atual (Linux); em outros sistemas usa o pico informado pelo getrusage
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except OSError:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / 1024 ** 2 if sys.platform == 'darwin' else pico / 1024
+
+
+def abrir_sessao(indice):
+    from streamlit.testing.v1 import AppTest
+
+    sessao = AppTest.from_file(os.path.join(RAIZ, 'dashboard.py'), default_timeout=300).run()
+    if sessao.exception:
+        raise RuntimeError(sessao.exception[0].value)
+    if indice % 2:
+        restaurantes = [m for m in sessao.sidebar.multiselect if m.label == '🍽️ Restaurante']
+        if restaurantes and restaurantes[0].options:
+            opcoes = restaurantes[0].options
+            restaurantes[0].set_value([opcoes[indice // 2 % len(opcoes)]]).run()
+    return sessao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fonte', help='arquivo ou planilha usada como FATURAMENTO_FONTE')
+    parser.add_argument('--linhas', type=int, default=100_000,
+                        help='sem --fonte, usa uma planilha sintética com este número de linhas (padrão: 100000)')
+    parser.add_argument('--sessoes', type=int, default=30, help='número de sessões simultâneas (padrão: 30)')
+    parser.add_argument('--passo', type=int, default=5, help='intervalo de sessões entre as medições (padrão: 5)')
+    args = parser.parse_args()
+
+    if args.fonte is None:
+        # Não importa o suite.py: ele carrega o faturamento antes de FATURAMENTO_FONTE ser definida
+        from gerar_dados import gerar_planilha
+        pasta = os.path.join(RAIZ, 'benchmarks', '.dados')
+        os.makedirs(pasta, exist_ok=True)
+        args.fonte = os.path.join(pasta, f"sinteticos_{args.linhas}.csv")
+        if not os.path.exists(args.fonte):
+            gerar_planilha(args.linhas).to_csv(args.fonte, index=False)
+    os.environ['FATURAMENTO_FONTE'] = args.fonte
+    sys.path.insert(0, RAIZ)
+    os.chdir(RAIZ)
+
+    inicial = memoria_mb()
+    sessoes = []
+    inicio = time.perf_counter()
+    sessoes.append(abrir_sessao(0))
+    gc.collect()
+    com_dados = memoria_mb()
+    print(f"processo sem sessões: {inicial:8.1f} MB")
+    print(f"1ª sessão (carga):    {com_dados:8.1f} MB  ({time.perf_counter() - inicio:.1f} s)")
+    print(f"{'sessões':>8} {'RSS (MB)':>10} {'MB/sessão extra':>16}")
+
+    for indice in range(1, args.sessoes):
+        sessoes.append(abrir_sessao(indice))
+        if len(sessoes) % args.passo == 0 or len(sessoes) == args.sessoes:
+            gc.collect()
+            atual = memoria_mb()
+            print(f"{len(sessoes):>8} {atual:>10.1f} {(atual - com_dados) / (len(sessoes) - 1):>16.2f}")
+
+
+if __name__ == '__main__':
+    main()
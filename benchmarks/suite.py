@@ -0,0 +1,281 @@
+"""Benchmarks do pipeline do painel sobre planilhas sintéticas (1 mil a 1 milhão de linhas).
+
+Mede, para cada tamanho: carregar_dados de um CSV local (sem e com cache em disco) e de várias
+fontes consolidadas, montagem do índice de filtros, todas as combinações de filtros de categoria
+(com e sem período), o cubo e as agregações dos KPIs/gráficos, gerar_excel,
+gerar_pdf_profissional e os relatórios em lote. Informa tempo (melhor de N repetições), vazão
+em linhas/s e pico de memória alocada (tracemalloc, em uma execução à parte para não distorcer
+o tempo).
+
+Os resultados podem ser gravados como baseline (--salvar-baseline); nas execuções seguintes
+cada caso é comparado com ela e os que ficarem mais lentos que a tolerância (relativa, e com
+pelo menos --minimo-ms de diferença) são marcados como regressão (código de saída 1).
+Casos que dependem do número de núcleos (threads da FonteMultipla, processos do GeradorLote)
+só são comparados com uma baseline gravada com o mesmo número de CPUs, maior que 1; nos demais
+casos aparecem como "não comparável". As cargas de uma única fonte rodam com o pyarrow limitado
+a uma thread, então continuam comparáveis em qualquer máquina.
+
+Uso:
+    python benchmarks/suite.py --tamanhos 1000 10000 100000
+    python benchmarks/suite.py --tamanhos 1000000 --limite-pdf 50000 --repeticoes 1
+    python benchmarks/suite.py --salvar-baseline
+"""
+import argparse
+import contextlib
+import datetime
+import gc
+import itertools
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(PASTA))
+
+import numpy as np
+import pandas as pd
+import pyarrow
+
+import faturamento
+from faturamento import (
+    carregar_dados, IndiceFiltros, CuboFaturamento, coluna_vencimento, gerar_excel, gerar_pdf_profissional,
+    GeradorLote,
+)
+from gerar_dados import gerar_planilha
+
+PASTA_DADOS = os.path.join(PASTA, '.dados')
+BASELINE = os.path.join(PASTA, 'baseline.json')
+UNIDADES = 4
+
+
+def arquivo_sintetico(linhas):
+    os.makedirs(PASTA_DADOS, exist_ok=True)
+    caminho = os.path.join(PASTA_DADOS, f"sinteticos_{linhas}.csv")
+    if not os.path.exists(caminho):
+        gerar_planilha(linhas).to_csv(caminho, index=False)
+    return caminho
+
+
+def medir(funcao, repeticoes, memoria, preparar=None):
+    # Melhor tempo de N repetições; o pico de memória vem de uma execução extra com tracemalloc
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        gc.collect()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    pico = None
+    if memoria:
+        if preparar:
+            preparar()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            funcao()
+            pico = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+    return min(tempos), pico
+
+
+@contextlib.contextmanager
+def pyarrow_uma_thread():
+    # Leitura/gravação Parquet do cache com uma thread só: o tempo não depende dos núcleos
+    cpus, io = pyarrow.cpu_count(), pyarrow.io_thread_count()
+    pyarrow.set_cpu_count(1)
+    pyarrow.set_io_thread_count(1)
+    try:
+        yield
+    finally:
+        pyarrow.set_cpu_count(cpus)
+        pyarrow.set_io_thread_count(io)
+
+
+def combinacoes_filtros(df, indice):
+    # Todas as combinações das colunas de categoria (cada uma com os dois primeiros valores),
+    # sem e com um período de faturamento cobrindo o ano do meio dos dados
+    colunas = [c for c in IndiceFiltros.COLUNAS_SELECAO if c in indice.codigos]
+    escolhas = {c: indice.valores(c)[:2] for c in colunas}
+    inicio, fim = indice.limites_data('Data_Faturamento')
+    meio = inicio + (fim - inicio) / 2
+    periodo = {'Data_Faturamento': (meio - datetime.timedelta(days=182), meio + datetime.timedelta(days=182))}
+
+    for quantidade in range(len(colunas) + 1):
+        for grupo in itertools.combinations(colunas, quantidade):
+            selecoes = {c: escolhas[c] for c in grupo}
+            yield selecoes, {}
+            yield selecoes, periodo
+
+
+def executar_tamanho(linhas, args):
+    caminho = arquivo_sintetico(linhas)
+    pasta_cache = tempfile.mkdtemp(prefix='bench_cache_')
+    faturamento.PASTA_CACHE = pasta_cache
+    resultados = []
+
+    def registrar(caso, funcao, linhas_processadas, preparar=None, paralelo=False):
+        # paralelo: o tempo depende do número de núcleos (ver comparar)
+        segundos, pico = medir(funcao, args.repeticoes, not args.sem_memoria, preparar)
+        resultado = {
+            'tamanho': linhas, 'caso': caso, 'segundos': round(segundos, 5),
+            'linhas_por_s': round(linhas_processadas / segundos) if segundos > 0 else None,
+            'pico_mb': round(pico, 2) if pico is not None else None,
+            'paralelo': paralelo,
+        }
+        resultados.append(resultado)
+        imprimir(resultado)
+
+    def limpar_cache():
+        shutil.rmtree(pasta_cache, ignore_errors=True)
+
+    try:
+        with pyarrow_uma_thread():
+            registrar('carregar_dados (sem cache)', lambda: carregar_dados(caminho), linhas, preparar=limpar_cache)
+            carregar_dados(caminho)
+            registrar('carregar_dados (com cache)', lambda: carregar_dados(caminho), linhas)
+        df = carregar_dados(caminho)
+
+        # A mesma planilha dividida em unidades, lidas em paralelo pela FonteMultipla
+        pasta_unidades = tempfile.mkdtemp(prefix='bench_unidades_')
+        unidades = {}
+        bruto = pd.read_csv(caminho)
+        for i, posicoes in enumerate(np.array_split(np.arange(len(bruto)), UNIDADES)):
+            unidades[f"Unidade {i + 1}"] = os.path.join(pasta_unidades, f"unidade_{i + 1}.csv")
+            bruto.iloc[posicoes].to_csv(unidades[f"Unidade {i + 1}"], index=False)
+        del bruto
+        registrar(f"carregar_dados ({UNIDADES} fontes, sem cache)", lambda: carregar_dados(unidades), linhas,
+                  preparar=limpar_cache, paralelo=True)
+        shutil.rmtree(pasta_unidades, ignore_errors=True)
+
+        colunas_data = ('Fim_Medição', 'Data_Faturamento', coluna_vencimento(df))
+        registrar('índice de filtros', lambda: IndiceFiltros(df, colunas_data), linhas)
+        indice = IndiceFiltros(df, colunas_data)
+        combinacoes = list(combinacoes_filtros(df, indice))
+
+        def filtrar_todas():
+            for selecoes, periodos in combinacoes:
+                posicoes = indice.linhas(selecoes, periodos)
+                df if posicoes is None else df.take(posicoes)
+        registrar(f"filtros ({len(combinacoes)} combinações)", filtrar_todas, linhas * len(combinacoes))
+
+        registrar('cubo (montagem)', lambda: CuboFaturamento(df), linhas)
+        cubos = [CuboFaturamento(df)]
+
+        def novo_cubo():
+            cubos[0] = CuboFaturamento(df)
+
+        def agregar_todas():
+            for selecoes, periodos in combinacoes:
+                cubos[0].resumo(selecoes, periodos)
+
+        def limpar_resumos():
+            cubos[0]._resumos.clear()
+        # A frio cada conjunto de colunas filtradas monta as suas tabelas marginais; depois
+        # só os valores escolhidos mudam (uso normal do painel)
+        registrar(f"agregações ({len(combinacoes)} combinações)", agregar_todas, linhas * len(combinacoes), preparar=novo_cubo)
+        cubos[0].LIMITE_TABELAS = len(combinacoes) * len(CuboFaturamento.GRAFICOS)
+        agregar_todas()
+        registrar(f"agregações ({len(combinacoes)} combinações, tabelas prontas)", agregar_todas, linhas * len(combinacoes), preparar=limpar_resumos)
+
+        registrar('gerar_excel', lambda: gerar_excel(df, motor='xlsxwriter'), linhas)
+        registrar('gerar_excel (openpyxl)', lambda: gerar_excel(df, motor='openpyxl'), linhas)
+        df_pdf = df.head(args.limite_pdf)
+        registrar(f"gerar_pdf_profissional ({len(df_pdf)} linhas)", lambda: gerar_pdf_profissional(df_pdf), len(df_pdf))
+
+        def gerar_lote():
+            lote = GeradorLote(df_pdf, 'Restaurante', ('pdf',))
+            lote.executar()
+            if lote.erro is not None:
+                raise lote.erro
+        registrar(f"relatórios em lote (PDF por Restaurante, {len(df_pdf)} linhas)", gerar_lote, len(df_pdf), paralelo=True)
+    finally:
+        shutil.rmtree(pasta_cache, ignore_errors=True)
+    return resultados
+
+
+def imprimir(resultado):
+    pico = f"{resultado['pico_mb']:9.1f}" if resultado['pico_mb'] is not None else f"{'-':>9}"
+    vazao = f"{resultado['linhas_por_s']:>14,}".replace(',', '.') if resultado['linhas_por_s'] else f"{'-':>14}"
+    print(f"{resultado['tamanho']:>9,}".replace(',', '.') + f"  {resultado['caso']:<56} {resultado['segundos']:>10.4f} s {vazao} linhas/s {pico} MB", flush=True)
+
+
+def comparar(resultados, baseline, tolerancia, minimo_ms=0.0, cpus=None):
+    # Regressão: mais lento que a tolerância relativa e por pelo menos minimo_ms (casos de poucos
+    # milissegundos oscilam bem mais que 25% entre execuções). Casos paralelos só são comparados
+    # se a baseline foi gravada com o mesmo número de CPUs, e mais de uma
+    cpus = cpus if cpus is not None else os.cpu_count()
+    cpus_baseline = baseline.get('ambiente', {}).get('cpus')
+    paralelos_comparaveis = cpus_baseline is not None and cpus_baseline > 1 and cpus_baseline == cpus
+    anteriores = {(r['tamanho'], r['caso']): r for r in baseline.get('resultados', [])}
+    regressoes = []
+    print(f"\nComparação com a baseline de {baseline.get('data', '?')} (tolerância {tolerancia:.0%}, mínimo {minimo_ms:g} ms):")
+    if not paralelos_comparaveis:
+        print(f"Baseline com {cpus_baseline or '?'} CPU(s) e esta máquina com {cpus}: casos paralelos não são comparados.")
+    for resultado in resultados:
+        anterior = anteriores.get((resultado['tamanho'], resultado['caso']))
+        if anterior is None:
+            continue
+        variacao = resultado['segundos'] / anterior['segundos'] - 1 if anterior['segundos'] else 0.0
+        diferenca_ms = (resultado['segundos'] - anterior['segundos']) * 1000
+        if (resultado.get('paralelo') or anterior.get('paralelo')) and not paralelos_comparaveis:
+            marca = 'não comparável'
+        elif variacao > tolerancia and diferenca_ms >= minimo_ms:
+            marca = 'REGRESSÃO'
+        else:
+            marca = 'melhor' if variacao < -tolerancia and -diferenca_ms >= minimo_ms else 'ok'
+        if marca == 'REGRESSÃO':
+            regressoes.append(resultado)
+        print(f"{resultado['tamanho']:>9}  {resultado['caso']:<56} {anterior['segundos']:>10.4f} s -> {resultado['segundos']:>10.4f} s ({variacao:+.0%}) {marca}")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help='linhas das planilhas sintéticas (padrão: 1000 10000 100000; até 1000000)')
+    parser.add_argument('--repeticoes', type=int, default=3, help='repetições por caso, vale o melhor tempo (padrão: 3)')
+    parser.add_argument('--limite-pdf', type=int, default=50_000, help='linhas usadas no PDF (padrão: 50000)')
+    parser.add_argument('--sem-memoria', action='store_true', help='não mede o pico de memória (mais rápido)')
+    parser.add_argument('--baseline', default=BASELINE, help=f'arquivo da baseline (padrão: {os.path.relpath(BASELINE)})')
+    parser.add_argument('--salvar-baseline', action='store_true', help='grava os resultados como nova baseline')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='piora aceita antes de acusar regressão (padrão: 0.25)')
+    parser.add_argument('--minimo-ms', type=float, default=10.0,
+                        help='diferença mínima em ms para acusar regressão, contra o ruído dos casos rápidos (padrão: 10)')
+    args = parser.parse_args(argv)
+
+    print(f"{'linhas':>9}  {'caso':<56} {'tempo':>12} {'vazão':>23} {'pico':>12}")
+    resultados = []
+    for linhas in args.tamanhos:
+        resultados += executar_tamanho(linhas, args)
+
+    if args.salvar_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'data': datetime.datetime.now().isoformat(timespec='seconds'),
+                'ambiente': {'python': platform.python_version(), 'pandas': pd.__version__,
+                             'numpy': np.__version__, 'plataforma': platform.platform(), 'cpus': os.cpu_count()},
+                'repeticoes': args.repeticoes,
+                'resultados': resultados,
+            }, arquivo, ensure_ascii=False, indent=1)
+        print(f"\nBaseline gravada em {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            regressoes = comparar(resultados, json.load(arquivo), args.tolerancia, args.minimo_ms)
+        if regressoes:
+            print(f"\n{len(regressoes)} caso(s) acima da tolerância.")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
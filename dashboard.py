@@ -1,30 +1,40 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+from streamlit.errors import StreamlitAPIException
 import datetime
-import re
-import calendar
-import os
-import io
-from fpdf import FPDF
+import hashlib
+import importlib.machinery
+import threading
+import time
+import collections
+import concurrent.futures
+from formatacao import formatar_moeda
+from desempenho import ultimas_execucoes, etapa, execucao, medido
+from faturamento import (
+    FONTE_PLANILHA, TENTATIVAS_DOWNLOAD, AtualizadorPlanilha, formatar_idade, IndiceFiltros, coluna_vencimento,
+    gerar_excel, gerar_pdf_profissional, GeradorLote, CuboFaturamento, buscar_texto, ordenar_posicoes, ordenar_colunas,
+)
+
+# O tema escuro fica em .streamlit/config.toml (versionado junto com o painel)
+
+# O Streamlit executa este script como __main__ sem __spec__, e processos 'spawn' (relatórios em
+# lote, GeradorLote) reexecutariam o painel inteiro ao iniciar. Com um __spec__ de nome
+# '__main__' (como em "python -m") o multiprocessing não reexecuta o script nos processos
+# filhos, que só precisam do faturamento
+__spec__ = importlib.machinery.ModuleSpec('__main__', None, origin=__file__)
+
+# Tempos por etapa desta execução do script (painel "⏱️ Desempenho" no fim da barra lateral); o
+# bloco 'with' fecha a execução também quando o script para antes do fim (st.stop, st.rerun, erro)
+with execucao('painel') as execucao_painel:
 
-# ----------------------------------------------------
-# FORÇAR MODO ESCURO NATIVO 
-# ----------------------------------------------------
-if not os.path.exists('.streamlit'):
-    os.makedirs('.streamlit')
-with open('.streamlit/config.toml', 'w', encoding='utf-8') as f:
-    f.write('[theme]\nbase="dark"\n')
-
-# ----------------------------------------------------
-# CONFIGURAÇÃO DA PÁGINA
-# ----------------------------------------------------
-st.set_page_config(page_title="Painel de Faturamento", layout="wide", initial_sidebar_state="expanded")
+    # ----------------------------------------------------
+    # CONFIGURAÇÃO DA PÁGINA
+    # ----------------------------------------------------
+    st.set_page_config(page_title="Painel de Faturamento", layout="wide", initial_sidebar_state="expanded")
 
-# ----------------------------------------------------
-# ESTILIZAÇÃO VISUAL 
-# ----------------------------------------------------
-st.markdown("""
+    # ----------------------------------------------------
+    # ESTILIZAÇÃO VISUAL 
+    # ----------------------------------------------------
+    st.markdown("""
 <style>
     .block-container {
         padding-top: 2rem !important;
@@ -62,266 +72,256 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# ----------------------------------------------------
-# 1. CONEXÃO E LIMPEZA DOS DADOS
-# ----------------------------------------------------
-@st.cache_data(ttl=60)
-def carregar_dados():
-    sheet_id = "1NHQWWv1TOnlX4YmKM0zZzIz4DwGt1yj1fd7snt_LFuk"
-    url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
-    
-    df = pd.read_csv(url)
-    df.columns = df.columns.str.strip()
-
-    def limpar_moeda(val):
-        if pd.isna(val): return 0.0
-        val_str = str(val).strip().replace('R$', '').strip()
-        if not val_str: return 0.0
-        
-        if '.' in val_str and ',' in val_str:
-            val_str = val_str.replace('.', '').replace(',', '.')
-        elif ',' in val_str:
-            val_str = val_str.replace(',', '.')
-            
-        try:
-            return float(val_str)
-        except:
-            return 0.0
+    # ----------------------------------------------------
+    # 1. CONEXÃO E LIMPEZA DOS DADOS (regras em faturamento.py)
+    # ----------------------------------------------------
+    @st.cache_resource
+    def obter_atualizador(fonte=FONTE_PLANILHA):
+        return AtualizadorPlanilha(fonte)
+
+    atualizador = obter_atualizador()
+    df_original, dados_atualizados_em, erro_atualizacao = atualizador.obter()
+
+    if df_original is None:
+        st.error(f"Erro ao ler a planilha: {erro_atualizacao}")
+        st.stop()
+
+    # Recarga manual: quem baixa é a thread do atualizador; a página só acompanha, por no máximo
+    # LIMITE_ESPERA_RECARGA segundos (com as novas tentativas a recarga pode levar bem mais)
+    LIMITE_ESPERA_RECARGA = 30
+
+    @st.fragment(run_every=1)
+    def acompanhar_recarga(atualizador, pedido, inicio):
+        if atualizador.atualizacoes >= pedido:
+            del st.session_state['recarga']
+            st.rerun()
+        if time.monotonic() - inicio > LIMITE_ESPERA_RECARGA:
+            del st.session_state['recarga']
+            st.toast("A atualização continua em segundo plano; os dados novos aparecem na próxima interação.")
+            st.rerun()
+        tentativa = atualizador.tentativa
+        st.caption(f"⏳ Atualizando dados da planilha (tentativa {tentativa} de {TENTATIVAS_DOWNLOAD})..." if tentativa else "⏳ Atualização solicitada...")
 
-    if 'Valor_Faturamento' in df.columns:
-        df['Valor_Faturamento'] = df['Valor_Faturamento'].apply(limpar_moeda)
-    else:
-        df['Valor_Faturamento'] = 0.0
-
-    col_vencimento = 'Data _Vencimento' if 'Data _Vencimento' in df.columns else 'Data_Vencimento'
-    colunas_data = ['Fim_Medição', 'Data_Faturamento', col_vencimento, 'Inicio_Medição']
-    for col in colunas_data:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], dayfirst=True, errors='coerce')
-        
-    if 'Data_Faturamento' in df.columns and 'Fim_Medição' in df.columns:
-        df['Tempo'] = (df['Data_Faturamento'] - df['Fim_Medição']).dt.days
-        
-    if col_vencimento in df.columns and 'Data_Faturamento' in df.columns:
-        df['Fat x Venc'] = (df[col_vencimento] - df['Data_Faturamento']).dt.days
-    
-    if 'Data_Faturamento' in df.columns:
-        df['Mes_Ano_Faturamento'] = df['Data_Faturamento'].dt.strftime('%m/%Y').fillna('Sem Data')
-    if col_vencimento in df.columns:
-        df['Mes_Ano_Vencimento'] = df[col_vencimento].dt.strftime('%m/%Y').fillna('Sem Data')
-    
-    colunas_texto = ['Restaurante', 'Cliente', 'Validação_Cliente', 'Medição_Encerrada', 'Carteira']
-    for col in colunas_texto:
-        if col in df.columns:
-            df[col] = df[col].fillna('Não Informado').astype(str).str.strip()
-            
-    if 'Carteira' in df.columns:
-        df['Carteira'] = df['Carteira'].replace(['Depósito em Conta', 'Deposito em Conta', 'DEPÓSITO EM CONTA'], 'Transferência Bancária')
-
-    def classificar_validacao(row):
-        carteira = str(row.get('Carteira', '')).strip()
-        if carteira == 'Sem Funcionamento':
-            return '🚫 Sem Funcionamento'
-            
-        fim_med = row.get('Fim_Medição')
-        encerrada = str(row.get('Medição_Encerrada', '')).strip()
-        hoje = pd.Timestamp.today()
-        
-        if (pd.notna(fim_med) and hoje < fim_med) or (encerrada.lower() == 'ok'):
-            return '⏳ Aguardando encerramento'
-            
-        dt_fat = row.get('Data_Faturamento')
-        dt_venc = row.get(col_vencimento)
-        valor = row.get('Valor_Faturamento', 0.0)
-        
-        carteira_preenchida = carteira not in ['Não Informado', '', 'nan', 'None']
-        fat_preenchido = pd.notna(dt_fat)
-        venc_preenchido = pd.notna(dt_venc)
-        valor_preenchido = valor > 0.0
-        
-        if fat_preenchido and venc_preenchido and valor_preenchido and carteira_preenchida:
-            return '✅ Concluído'
-        else:
-            return '⚠️ Pendente'
-            
-    df['Validação'] = df.apply(classificar_validacao, axis=1)
-
-    def validar_vencimento(row):
-        venc_real = row.get(col_vencimento)
-        dt_fat = row.get('Data_Faturamento')
-        fim_med = row.get('Fim_Medição')
-        inicio_med = row.get('Inicio_Medição')
-        prazo_raw = row.get('Prazo')
-        dia_texto = str(row.get('Dia', '')).strip().lower()
-
-        if dia_texto in ['', 'nan', 'none', 'não informado']:
-            return '➖ Não Avaliado'
-
-        if pd.notna(venc_real) and pd.notna(dt_fat) and pd.notna(prazo_raw):
-            try:
-                prazo_match = re.search(r'(\d+)', str(prazo_raw))
-                if prazo_match:
-                    prazo_dias_limite = int(prazo_match.group(1))
-                    prazo_real_executado = (venc_real - dt_fat).days
-                    if prazo_real_executado < prazo_dias_limite:
-                        return '🚀 Antecipado'
-            except:
-                pass
-
-        if "antecipado" in dia_texto:
-            if pd.isna(dt_fat) or pd.isna(inicio_med):
-                return '➖ Não Avaliado'
-            return '🚀 Antecipado' if dt_fat < inicio_med else '❌ Não Antecipado'
-
-        dias_semana = {'segunda': 0, 'terça': 1, 'terca': 1, 'quarta': 2, 'quinta': 3, 'sexta': 4, 'sábado': 5, 'sabado': 5, 'domingo': 6}
-        for nome_dia, num_dia in dias_semana.items():
-            if nome_dia in dia_texto:
-                if pd.isna(venc_real): return '➖ Não Avaliado'
-                return '✅ Dentro do Prazo' if venc_real.weekday() == num_dia else '❌ Depois do Prazo'
-
-        match = re.search(r'(\d+)', dia_texto)
-        if not match: return '➖ Não Avaliado'
-        numero_dia = int(match.group(1))
-
-        if numero_dia == 0:
-            fat_venc = (venc_real - dt_fat).days if pd.notna(venc_real) and pd.notna(dt_fat) else None
-            if fat_venc is None or pd.isna(prazo_raw): return '➖ Não Avaliado'
-            p_match = re.search(r'(\d+)', str(prazo_raw))
-            if p_match:
-                return '✅ Dentro do Prazo' if int(fat_venc) == int(p_match.group(1)) else '❌ Depois do Prazo'
-            return '➖ Não Avaliado'
-
-        if pd.isna(venc_real) or pd.isna(fim_med): return '➖ Não Avaliado'
-
-        dia_alvo = numero_dia
-        mes_alvo = fim_med.month
-        ano_alvo = fim_med.year
-        
-        if dia_alvo <= fim_med.day:
-            mes_alvo += 1
-            if mes_alvo > 12:
-                mes_alvo = 1; ano_alvo += 1
-                
-        try:
-            ultimo_dia_mes = calendar.monthrange(ano_alvo, mes_alvo)[1]
-            data_alvo = pd.Timestamp(year=ano_alvo, month=mes_alvo, day=min(dia_alvo, ultimo_dia_mes))
-            v_date = venc_real.date()
-            a_date = data_alvo.date()
-            if v_date == a_date: return '✅ Dentro do Prazo'
-            elif v_date > a_date: return '❌ Depois do Prazo'
-            else: return '🚀 Antecipado'
-        except:
-            return '➖ Erro no Cálculo'
-
-    if 'Dia' in df.columns:
-        df['Validação do Vencimento'] = df.apply(validar_vencimento, axis=1)
-
-    return df
-
-try:
-    df_original = carregar_dados()
-except Exception as e:
-    st.error(f"Erro ao ler a planilha: {e}")
-    st.stop()
+    # ----------------------------------------------------
+    # 2. FILTROS
+    # ----------------------------------------------------
+    @st.cache_resource(max_entries=2)
+    def obter_indice_filtros(_df, versao, colunas_data):
+        with etapa('índice de filtros (montagem)', len(_df)):
+            return IndiceFiltros(_df, colunas_data)
+
+    st.sidebar.title("Filtros do Painel")
+
+    if st.sidebar.button("🔄 Recarregar Dados", disabled='recarga' in st.session_state):
+        st.session_state['recarga'] = (atualizador.solicitar_atualizacao(), time.monotonic())
+    if 'recarga' in st.session_state:
+        with st.sidebar:
+            acompanhar_recarga(atualizador, *st.session_state['recarga'])
+
+    st.sidebar.caption(f"🕒 Dados atualizados há {formatar_idade(dados_atualizados_em)}")
+    if erro_atualizacao is not None:
+        st.sidebar.warning(f"⚠️ Falha ao atualizar a planilha, exibindo o último dado válido: {erro_atualizacao}")
+
+    if 'memoria_depois' in df_original.attrs:
+        st.sidebar.caption(
+            f"💾 Memória dos dados: {df_original.attrs['memoria_depois'] / 1024 ** 2:.1f} MB "
+            f"(antes da compactação: {df_original.attrs['memoria_antes'] / 1024 ** 2:.1f} MB)"
+        )
 
-# ----------------------------------------------------
-# 2. FILTROS
-# ----------------------------------------------------
-st.sidebar.title("Filtros do Painel")
-
-if st.sidebar.button("🔄 Recarregar Dados"):
-    st.cache_data.clear()
-    st.rerun()
-
-def obter_limites_data(coluna):
-    if coluna in df_original.columns:
-        datas_validas = df_original[coluna].dropna()
-        if not datas_validas.empty:
-            return datas_validas.min().date(), datas_validas.max().date()
-    hoje = datetime.date.today()
-    return hoje, hoje
-
-min_fech, max_fech = obter_limites_data('Fim_Medição')
-min_fat, max_fat = obter_limites_data('Data_Faturamento')
-col_venc = 'Data _Vencimento' if 'Data _Vencimento' in df_original.columns else 'Data_Vencimento'
-min_venc, max_venc = obter_limites_data(col_venc)
-
-st.sidebar.markdown("### 📅 Períodos (Datas)")
-filtro_fechamento = st.sidebar.date_input("Data de Fechamento", value=(min_fech, max_fech), format="DD/MM/YYYY")
-filtro_fat = st.sidebar.date_input("Período de Faturamento", value=(min_fat, max_fat), format="DD/MM/YYYY")
-filtro_venc = st.sidebar.date_input("Período de Vencimento", value=(min_venc, max_venc), format="DD/MM/YYYY")
-
-st.sidebar.markdown("### 🏆 Rankings")
-ranking_clientes = st.sidebar.selectbox("Ranking Clientes", ["Top 10 Clientes", "Top 5 Clientes", "Top 3 Clientes"])
-ranking_restaurantes = st.sidebar.selectbox("Ranking Restaurantes", ["Top 10 Restaurantes", "Top 5 Restaurantes", "Top 3 Restaurantes"])
-
-st.sidebar.markdown("### 📋 Categorias")
-def pegar_unicos(coluna):
-    if coluna in df_original.columns:
-        return sorted([x for x in df_original[coluna].unique() if x != 'Não Informado' and x != 'Sem Data'])
-    return []
-
-filtro_restaurante = st.sidebar.multiselect("🍽️ Restaurante", pegar_unicos('Restaurante'))
-filtro_cliente = st.sidebar.multiselect("🏢 Cliente", pegar_unicos('Cliente'))
-filtro_val_cliente = st.sidebar.multiselect("🤝 Validação Cliente", pegar_unicos('Validação_Cliente'))
-filtro_validacao = st.sidebar.multiselect("✅ Validação Geral", pegar_unicos('Validação'))
-filtro_val_venc = st.sidebar.multiselect("📆 Validação de Vencimento", pegar_unicos('Validação do Vencimento'))
-filtro_encerrado = st.sidebar.multiselect("🔒 Encerrado", pegar_unicos('Medição_Encerrada'))
-filtro_carteira = st.sidebar.multiselect("💼 Carteira", pegar_unicos('Carteira'))
-
-df_filtrado = df_original.copy()
-
-if len(filtro_fechamento) == 2:
-    if filtro_fechamento[0] != min_fech or filtro_fechamento[1] != max_fech:
-        df_filtrado = df_filtrado[df_filtrado['Fim_Medição'].notna() & 
-                                  (df_filtrado['Fim_Medição'].dt.date >= filtro_fechamento[0]) & 
-                                  (df_filtrado['Fim_Medição'].dt.date <= filtro_fechamento[1])]
-
-if len(filtro_fat) == 2:
-    if filtro_fat[0] != min_fat or filtro_fat[1] != max_fat:
-        df_filtrado = df_filtrado[df_filtrado['Data_Faturamento'].notna() & 
-                                  (df_filtrado['Data_Faturamento'].dt.date >= filtro_fat[0]) & 
-                                  (df_filtrado['Data_Faturamento'].dt.date <= filtro_fat[1])]
-
-if len(filtro_venc) == 2:
-    if filtro_venc[0] != min_venc or filtro_venc[1] != max_venc:
-        df_filtrado = df_filtrado[df_filtrado[col_venc].notna() & 
-                                  (df_filtrado[col_venc].dt.date >= filtro_venc[0]) & 
-                                  (df_filtrado[col_venc].dt.date <= filtro_venc[1])]
-
-if filtro_restaurante: df_filtrado = df_filtrado[df_filtrado['Restaurante'].isin(filtro_restaurante)]
-if filtro_cliente: df_filtrado = df_filtrado[df_filtrado['Cliente'].isin(filtro_cliente)]
-if filtro_val_cliente: df_filtrado = df_filtrado[df_filtrado['Validação_Cliente'].isin(filtro_val_cliente)]
-if filtro_validacao: df_filtrado = df_filtrado[df_filtrado['Validação'].isin(filtro_validacao)]
-if filtro_val_venc: df_filtrado = df_filtrado[df_filtrado['Validação do Vencimento'].isin(filtro_val_venc)]
-if filtro_encerrado: df_filtrado = df_filtrado[df_filtrado['Medição_Encerrada'].isin(filtro_encerrado)]
-if filtro_carteira: df_filtrado = df_filtrado[df_filtrado['Carteira'].isin(filtro_carteira)]
+    valores_invalidos = df_original.attrs.get('valores_invalidos', 0)
+    if valores_invalidos:
+        st.sidebar.warning(f"⚠️ {valores_invalidos} valor(es) de faturamento não reconhecido(s) foram considerados R$ 0,00.")
+
+    col_venc = coluna_vencimento(df_original)
+    indice_filtros = obter_indice_filtros(
+        df_original, df_original.attrs.get('versao_dados', id(df_original)), ('Fim_Medição', 'Data_Faturamento', col_venc)
+    )
+
+    min_fech, max_fech = indice_filtros.limites_data('Fim_Medição')
+    min_fat, max_fat = indice_filtros.limites_data('Data_Faturamento')
+    min_venc, max_venc = indice_filtros.limites_data(col_venc)
+
+    st.sidebar.markdown("### 📅 Períodos (Datas)")
+    filtro_fechamento = st.sidebar.date_input("Data de Fechamento", value=(min_fech, max_fech), format="DD/MM/YYYY")
+    filtro_fat = st.sidebar.date_input("Período de Faturamento", value=(min_fat, max_fat), format="DD/MM/YYYY")
+    filtro_venc = st.sidebar.date_input("Período de Vencimento", value=(min_venc, max_venc), format="DD/MM/YYYY")
+
+    st.sidebar.markdown("### 🏆 Rankings")
+    ranking_clientes = st.sidebar.selectbox("Ranking Clientes", ["Top 10 Clientes", "Top 5 Clientes", "Top 3 Clientes"])
+    ranking_restaurantes = st.sidebar.selectbox("Ranking Restaurantes", ["Top 10 Restaurantes", "Top 5 Restaurantes", "Top 3 Restaurantes"])
+    rotulos_evolucao = st.sidebar.selectbox("Valores nos gráficos de evolução", ["Automático", "Sempre", "Nunca"])
+
+    st.sidebar.markdown("### 📋 Categorias")
+    filtro_restaurante = st.sidebar.multiselect("🍽️ Restaurante", indice_filtros.valores('Restaurante'))
+    filtro_cliente = st.sidebar.multiselect("🏢 Cliente", indice_filtros.valores('Cliente'))
+    filtro_val_cliente = st.sidebar.multiselect("🤝 Validação Cliente", indice_filtros.valores('Validação_Cliente'))
+    filtro_validacao = st.sidebar.multiselect("✅ Validação Geral", indice_filtros.valores('Validação'))
+    filtro_val_venc = st.sidebar.multiselect("📆 Validação de Vencimento", indice_filtros.valores('Validação do Vencimento'))
+    filtro_encerrado = st.sidebar.multiselect("🔒 Encerrado", indice_filtros.valores('Medição_Encerrada'))
+    filtro_carteira = st.sidebar.multiselect("💼 Carteira", indice_filtros.valores('Carteira'))
+    # Painel consolidado (várias planilhas): filtro pela unidade de origem
+    origens = indice_filtros.valores('Origem')
+    filtro_origem = st.sidebar.multiselect("🏬 Origem", origens) if len(origens) > 1 else []
+
+    periodos = {}
+    if len(filtro_fechamento) == 2 and (filtro_fechamento[0] != min_fech or filtro_fechamento[1] != max_fech):
+        periodos['Fim_Medição'] = filtro_fechamento
+    if len(filtro_fat) == 2 and (filtro_fat[0] != min_fat or filtro_fat[1] != max_fat):
+        periodos['Data_Faturamento'] = filtro_fat
+    if len(filtro_venc) == 2 and (filtro_venc[0] != min_venc or filtro_venc[1] != max_venc):
+        periodos[col_venc] = filtro_venc
+
+    selecoes = {
+        'Restaurante': filtro_restaurante,
+        'Cliente': filtro_cliente,
+        'Validação_Cliente': filtro_val_cliente,
+        'Validação': filtro_validacao,
+        'Validação do Vencimento': filtro_val_venc,
+        'Medição_Encerrada': filtro_encerrado,
+        'Carteira': filtro_carteira,
+        'Origem': filtro_origem,
+    }
 
-# ----------------------------------------------------
-# 3. PAINEL PRINCIPAL & KPIs
-# ----------------------------------------------------
-st.title("📊 Painel Gerencial de Faturamento")
-st.markdown("---")
-
-if df_filtrado.empty:
-    st.warning("⚠️ Nenhum dado encontrado na planilha ou para os filtros selecionados.")
-else:
-    faturamento_total = df_filtrado['Valor_Faturamento'].sum()
-    contagem_medicoes = df_filtrado[df_filtrado['Valor_Faturamento'] > 0].shape[0]
-    faturamento_medio = (faturamento_total / contagem_medicoes) if contagem_medicoes > 0 else 0.0
-    total_clientes = df_filtrado['Cliente'].str.split('-').str[0].str.strip().nunique()
-
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("💰 Faturamento Total", f"R$ {faturamento_total:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-    with col2:
-        st.metric("📈 Ticket Médio", f"R$ {faturamento_medio:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-    with col3:
-        st.metric("📋 Total de Medições", contagem_medicoes)
-    with col4:
-        st.metric("👥 Total de Clientes", total_clientes)
-
-    st.markdown("<br>", unsafe_allow_html=True)
+    with etapa('filtros') as medicao:
+        linhas_filtradas = indice_filtros.linhas(selecoes, periodos)
+        df_filtrado = df_original if linhas_filtradas is None else df_original.take(linhas_filtradas)
+        medicao['linhas'] = len(df_filtrado)
+
+    # ----------------------------------------------------
+    # EXPORTAÇÃO (Excel / PDF)
+    # ----------------------------------------------------
+    class ExportadorRelatorios:
+        # Fila de geração em threads, compartilhada pelo processo; guarda os últimos arquivos gerados
+        LIMITE_ARQUIVOS = 16
+
+        def __init__(self, max_workers=2):
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='exportacao')
+            self._tarefas = collections.OrderedDict()
+            self._lock = threading.Lock()
+
+        def obter(self, chave):
+            with self._lock:
+                return self._tarefas.get(chave)
+
+        def solicitar(self, chave, gerar, df_export):
+            with self._lock:
+                if chave not in self._tarefas:
+                    self._tarefas[chave] = self._executor.submit(self._gerar, chave[0], gerar, df_export)
+                    concluidas = [k for k, t in self._tarefas.items() if t.done()]
+                    while len(self._tarefas) > self.LIMITE_ARQUIVOS and concluidas:
+                        self._tarefas.pop(concluidas.pop(0))
+                return self._tarefas[chave]
+
+        @staticmethod
+        def _gerar(tipo, gerar, df_export):
+            with execucao(f"exportação ({tipo})"), etapa(f"geração {tipo.upper()}", len(df_export)):
+                return gerar(df_export)
+
+        def descartar(self, chave):
+            with self._lock:
+                self._tarefas.pop(chave, None)
+
+    @st.cache_resource
+    def obter_exportador():
+        return ExportadorRelatorios()
+
+    def refazer_fragmento():
+        # Refaz só o fragmento em execução. Se o clique chegou junto com uma execução completa do
+        # script (ex.: outro widget alterado ao mesmo tempo) o Streamlit não aceita esse escopo,
+        # e a execução completa é refeita
+        try:
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:
+            st.rerun()
+
+    def exibir_exportacao(exportador, chave, df_export, gerar, rotulo, file_name, mime):
+        # Sempre chamada dentro de um fragmento (painel_interativo ou acompanhar_exportacao):
+        # cliques e a conclusão refazem só esse fragmento, não os filtros e KPIs do script
+        tarefa = exportador.obter(chave)
+        if tarefa is None:
+            if st.button(rotulo, key=f"preparar_{chave[0]}"):
+                exportador.solicitar(chave, gerar, df_export)
+                refazer_fragmento()
+        elif not tarefa.done():
+            st.button("⏳ Gerando...", disabled=True, key=f"gerando_{chave[0]}")
+        elif tarefa.exception() is not None:
+            st.error(f"Erro ao gerar {chave[0].upper()}: {tarefa.exception()}")
+            if st.button("🔁 Tentar novamente", key=f"repetir_{chave[0]}"):
+                exportador.descartar(chave)
+                refazer_fragmento()
+        else:
+            # O arquivo só é enviado ao navegador no clique, então as atualizações periódicas
+            # do fragmento não reenviam o conteúdo
+            st.download_button(label=rotulo, data=tarefa.result, file_name=file_name, mime=mime, key=f"baixar_{chave[0]}")
+
+    @st.fragment(run_every=1)
+    def acompanhar_exportacao(*args):
+        # Fragmento dentro do painel_interativo: enquanto o arquivo é gerado, só esta área é
+        # refeita a cada segundo e, ao terminar, ela mesma mostra o download (ou o erro)
+        exibir_exportacao(*args)
+
+    def area_exportacao(exportador, chave, df_export, gerar, rotulo, file_name, mime):
+        tarefa = exportador.obter(chave)
+        if tarefa is not None and not tarefa.done():
+            acompanhar_exportacao(exportador, chave, df_export, gerar, rotulo, file_name, mime)
+        else:
+            exibir_exportacao(exportador, chave, df_export, gerar, rotulo, file_name, mime)
+
+    def exibir_lote(df_filtrado, col_venc):
+        # Como em exibir_exportacao: sempre dentro de um fragmento (area_relatorios_lote ou
+        # acompanhar_lote), então os cliques refazem só esse fragmento
+        lote = st.session_state.get('lote')
+        if lote is None:
+            coluna = st.radio("Um relatório por", ["Cliente", "Restaurante"], horizontal=True, key="lote_coluna")
+            formatos = st.multiselect("Formatos", ["pdf", "xlsx"], default=["pdf"], key="lote_formatos")
+            if st.button("📦 Gerar relatórios", key="lote_gerar", disabled=not formatos):
+                lote = GeradorLote(ordenar_colunas(df_filtrado, col_venc), coluna, formatos)
+                threading.Thread(target=lote.executar, name='relatorios-lote', daemon=True).start()
+                st.session_state['lote'] = lote
+                refazer_fragmento()
+        elif not lote.finalizado:
+            progresso = lote.concluidos / lote.total if lote.total else 0.0
+            st.progress(progresso, text=f"Gerando relatórios: {lote.concluidos} de {lote.total or '...'}")
+            if st.button("⛔ Cancelar", key="lote_cancelar"):
+                lote.cancelar()
+        else:
+            if lote.erro is not None:
+                st.error(f"Erro ao gerar os relatórios: {lote.erro}")
+            elif lote.cancelado:
+                st.warning("Geração cancelada.")
+            else:
+                st.download_button(
+                    label=f"📥 Baixar {lote.total} relatório(s) por {lote.coluna} (.zip)", data=lambda: lote.resultado,
+                    file_name=f"relatorios_{lote.coluna.lower()}_{datetime.date.today()}.zip",
+                    mime="application/zip", key="lote_baixar"
+                )
+            if st.button("🔁 Novo lote", key="lote_novo"):
+                del st.session_state['lote']
+                refazer_fragmento()
+
+    @st.fragment(run_every=1)
+    def acompanhar_lote(df_filtrado, col_venc):
+        # Progresso atualizado a cada segundo; ao terminar mostra o download (ou o erro)
+        exibir_lote(df_filtrado, col_venc)
+
+    @st.fragment
+    def area_relatorios_lote(df_filtrado, col_venc):
+        # Um arquivo por Cliente/Restaurante dos dados filtrados, gerados em paralelo (GeradorLote)
+        # em uma thread da sessão, com progresso e cancelamento
+        with st.expander("📦 Relatórios em lote (um arquivo por Cliente ou Restaurante)"):
+            lote = st.session_state.get('lote')
+            if lote is not None and not lote.finalizado:
+                acompanhar_lote(df_filtrado, col_venc)
+            else:
+                exibir_lote(df_filtrado, col_venc)
+
+    # ----------------------------------------------------
+    # 3. PAINEL PRINCIPAL & KPIs
+    # ----------------------------------------------------
+    @st.cache_resource(max_entries=2)
+    def obter_cubo(_df, versao):
+        with etapa('cubo (montagem)', len(_df)):
+            return CuboFaturamento(_df)
 
     # ----------------------------------------------------
     # 4. GRÁFICOS COM INTERAÇÃO (on_select="rerun")
@@ -336,216 +336,268 @@ else:
         fig.update_yaxes(title_text='', showgrid=True, gridcolor='rgba(200, 200, 200, 0.2)', zeroline=False)
         return fig
 
-    col_graf1, col_graf2 = st.columns(2)
+    # Rótulo de valor em cada ponto das séries mensais: no modo automático só em séries curtas,
+    # para que históricos de vários anos não gerem figuras pesadas e ilegíveis
+    LIMITE_PONTOS_ROTULADOS = 24
+
+    def mostrar_rotulos(pontos, rotulos):
+        if rotulos == "Automático":
+            return pontos <= LIMITE_PONTOS_ROTULADOS
+        return rotulos == "Sempre"
 
-    with col_graf1:
-        df_cliente = df_filtrado.groupby('Cliente', as_index=False)['Valor_Faturamento'].sum().sort_values('Valor_Faturamento', ascending=True)
+    def montar_graficos(resumo, ranking_clientes, ranking_restaurantes, rotulos="Automático"):
+        # Plotly só é importado quando há gráficos a montar. Cada figura recebe só as colunas que
+        # usa, para que o JSON enviado ao navegador não carregue dados a mais
+        import plotly.express as px
+
+        graficos = {}
+
+        df_cliente = resumo['por_cliente']
         if ranking_clientes == "Top 10 Clientes": df_cliente = df_cliente.tail(10)
         elif ranking_clientes == "Top 5 Clientes": df_cliente = df_cliente.tail(5)
         elif ranking_clientes == "Top 3 Clientes": df_cliente = df_cliente.tail(3)
-        df_cliente['Valor_Formatado'] = df_cliente['Valor_Faturamento'].apply(lambda x: f"<b>R$ {x:,.2f}</b>".replace(",", "X").replace(".", ",").replace("X", "."))
+        df_cliente = df_cliente.assign(Valor_Formatado='<b>' + formatar_moeda(df_cliente['Valor_Faturamento']) + '</b>')
         fig_cliente = px.bar(df_cliente, x='Valor_Faturamento', y='Cliente', orientation='h', title='Faturamento por Cliente', text='Valor_Formatado', color_discrete_sequence=['#3498db'])
         fig_cliente.update_traces(textposition='inside', textfont_size=16, textfont_color='white')
-        evento_cliente = st.plotly_chart(aplicar_estilo_grafico(fig_cliente), use_container_width=True, on_select="rerun")
+        graficos['cliente'] = aplicar_estilo_grafico(fig_cliente)
 
-    with col_graf2:
-        df_rest = df_filtrado.groupby('Restaurante', as_index=False)['Valor_Faturamento'].sum().sort_values('Valor_Faturamento', ascending=True)
+        df_rest = resumo['por_restaurante']
         if ranking_restaurantes == "Top 10 Restaurantes": df_rest = df_rest.tail(10)
         elif ranking_restaurantes == "Top 5 Restaurantes": df_rest = df_rest.tail(5)
         elif ranking_restaurantes == "Top 3 Restaurantes": df_rest = df_rest.tail(3)
-        df_rest['Valor_Formatado'] = df_rest['Valor_Faturamento'].apply(lambda x: f"<b>R$ {x:,.2f}</b>".replace(",", "X").replace(".", ",").replace("X", "."))
+        df_rest = df_rest.assign(Valor_Formatado='<b>' + formatar_moeda(df_rest['Valor_Faturamento']) + '</b>')
         fig_rest = px.bar(df_rest, x='Valor_Faturamento', y='Restaurante', orientation='h', title='Faturamento por Restaurante', text='Valor_Formatado', color_discrete_sequence=['#e67e22'])
         fig_rest.update_traces(textposition='inside', textfont_size=16, textfont_color='white')
-        evento_rest = st.plotly_chart(aplicar_estilo_grafico(fig_rest), use_container_width=True, on_select="rerun")
-
-    col_graf3, col_graf4 = st.columns(2)
-
-    with col_graf3:
-        if 'Mes_Ano_Faturamento' in df_filtrado.columns:
-            df_tempo = df_filtrado[df_filtrado['Mes_Ano_Faturamento'] != 'Sem Data'].copy()
-            df_tempo['Data_Ordenacao'] = pd.to_datetime(df_tempo['Mes_Ano_Faturamento'], format='%m/%Y', errors='coerce')
-            df_tempo = df_tempo.groupby(['Mes_Ano_Faturamento', 'Data_Ordenacao'], as_index=False)['Valor_Faturamento'].sum().sort_values('Data_Ordenacao')
-            df_tempo['Valor_Texto'] = df_tempo['Valor_Faturamento'].apply(lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-            fig_tempo = px.area(df_tempo, x='Mes_Ano_Faturamento', y='Valor_Faturamento', title='Evolução por Mês/Ano', markers=True, text='Valor_Texto', color_discrete_sequence=['#2ecc71'])
+        graficos['restaurante'] = aplicar_estilo_grafico(fig_rest)
+
+        # As séries mensais já chegam em ordem cronológica (CuboFaturamento.calcular_resumo)
+        if 'por_mes' in resumo:
+            df_tempo = resumo['por_mes'][['Mes_Ano_Faturamento', 'Valor_Faturamento']]
+            texto = None
+            if mostrar_rotulos(len(df_tempo), rotulos):
+                df_tempo = df_tempo.assign(Valor_Texto=formatar_moeda(df_tempo['Valor_Faturamento']))
+                texto = 'Valor_Texto'
+            fig_tempo = px.area(df_tempo, x='Mes_Ano_Faturamento', y='Valor_Faturamento', title='Evolução por Mês/Ano', markers=True, text=texto, color_discrete_sequence=['#2ecc71'])
             fig_tempo.update_traces(line_shape='spline', textposition='top center', textfont=dict(color='white', size=12))
-            evento_tempo = st.plotly_chart(aplicar_estilo_grafico(fig_tempo), use_container_width=True, on_select="rerun")
-
-    with col_graf4:
-        if 'Mes_Ano_Faturamento' in df_filtrado.columns and 'Carteira' in df_filtrado.columns:
-            df_cart_plot = df_filtrado[df_filtrado['Mes_Ano_Faturamento'] != 'Sem Data'].copy()
-            df_cart_plot['Data_Ordenacao'] = pd.to_datetime(df_cart_plot['Mes_Ano_Faturamento'], format='%m/%Y', errors='coerce')
-            df_cart_plot = df_cart_plot.groupby(['Mes_Ano_Faturamento', 'Data_Ordenacao', 'Carteira'], as_index=False)['Valor_Faturamento'].sum().sort_values('Data_Ordenacao')
-            df_cart_plot['Valor_Texto'] = df_cart_plot['Valor_Faturamento'].apply(lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-            fig_carteira = px.line(df_cart_plot, x='Mes_Ano_Faturamento', y='Valor_Faturamento', color='Carteira', title='Evolução por Carteira', markers=True, text='Valor_Texto')
+            graficos['tempo'] = aplicar_estilo_grafico(fig_tempo)
+
+        if 'por_mes_carteira' in resumo:
+            df_cart_plot = resumo['por_mes_carteira'][['Mes_Ano_Faturamento', 'Carteira', 'Valor_Faturamento']]
+            meses = df_cart_plot['Mes_Ano_Faturamento'].unique().tolist()
+            texto = None
+            # No automático conta os meses do eixo: os rótulos das várias linhas se sobrepõem
+            if mostrar_rotulos(len(meses), rotulos):
+                df_cart_plot = df_cart_plot.assign(Valor_Texto=formatar_moeda(df_cart_plot['Valor_Faturamento']))
+                texto = 'Valor_Texto'
+            fig_carteira = px.line(df_cart_plot, x='Mes_Ano_Faturamento', y='Valor_Faturamento', color='Carteira', title='Evolução por Carteira', markers=True, text=texto,
+                                   category_orders={'Mes_Ano_Faturamento': meses})
             fig_carteira.update_traces(textposition="top center", line_shape='spline', line=dict(width=3))
-            evento_carteira = st.plotly_chart(aplicar_estilo_grafico(fig_carteira), use_container_width=True, on_select="rerun")
+            graficos['carteira'] = aplicar_estilo_grafico(fig_carteira)
+
+        return graficos
+
+    def obter_graficos(resumo, ranking_clientes, ranking_restaurantes, rotulos="Automático"):
+        # As figuras ficam guardadas na sessão enquanto o resumo (estado dos filtros), os rankings
+        # e as opções não mudam, assim um clique nos gráficos não remonta as quatro figuras
+        guardado = st.session_state.get('_graficos')
+        opcoes = (ranking_clientes, ranking_restaurantes, rotulos)
+        if guardado is None or guardado[0] is not resumo or guardado[1] != opcoes:
+            with etapa('gráficos (Plotly)'):
+                guardado = (resumo, opcoes, montar_graficos(resumo, ranking_clientes, ranking_restaurantes, rotulos))
+            st.session_state['_graficos'] = guardado
+        return guardado[2]
 
     # ----------------------------------------------------
-    # 5. TABELA DE DETALHAMENTO (Com Filtro de Seleção)
+    # TABELA PAGINADA (busca e ordenação no servidor)
     # ----------------------------------------------------
-    st.markdown("### 📋 Tabela de Dados")
-    df_exibicao = df_filtrado.copy()
-    
-    # Capturar pontos selecionados nos gráficos para filtrar a tabela
-    sel_clientes = [p['y'] for p in evento_cliente.selection.get('points', [])] if evento_cliente and 'selection' in evento_cliente else []
-    sel_rests = [p['y'] for p in evento_rest.selection.get('points', [])] if evento_rest and 'selection' in evento_rest else []
-    sel_meses = [p['x'] for p in evento_tempo.selection.get('points', [])] if evento_tempo and 'selection' in evento_tempo else []
-    sel_carteiras = [p['customdata'][0] if 'customdata' in p else None for p in evento_carteira.selection.get('points', [])] if evento_carteira and 'selection' in evento_carteira else []
-
-    if sel_clientes: df_exibicao = df_exibicao[df_exibicao['Cliente'].isin(sel_clientes)]
-    if sel_rests: df_exibicao = df_exibicao[df_exibicao['Restaurante'].isin(sel_rests)]
-    if sel_meses: df_exibicao = df_exibicao[df_exibicao['Mes_Ano_Faturamento'].isin(sel_meses)]
-    if any(sel_carteiras): df_exibicao = df_exibicao[df_exibicao['Carteira'].isin(sel_carteiras)]
-
-    cols = list(df_exibicao.columns)
-    for c in ['Tempo', 'Fat x Venc', 'Validação', 'Validação do Vencimento']:
-        if c in cols: cols.remove(c)
-    
-    if 'Data_Faturamento' in cols:
-        idx_fat = cols.index('Data_Faturamento')
-        if 'Tempo' in df_filtrado.columns:
-            cols.insert(idx_fat, 'Tempo')
-            idx_fat += 1
-        if 'Fat x Venc' in df_filtrado.columns:
-            cols.insert(idx_fat + 1, 'Fat x Venc')
-
-    if 'Fim_Medição' in cols:
-        idx_fim = cols.index('Fim_Medição')
-        if 'Validação' in df_filtrado.columns:
-            cols.insert(idx_fim + 1, 'Validação')
-
-    if col_venc in cols:
-        idx_venc = cols.index(col_venc)
-        if 'Validação do Vencimento' in df_filtrado.columns:
-            cols.insert(idx_venc + 1, 'Validação do Vencimento')
-
-    df_exibicao = df_exibicao[cols]
-
-    # --- BOTÕES DE AÇÃO ---
-    col_btn1, col_btn2, col_btn3 = st.columns([2, 2, 6])
-    
-    with col_btn1:
-        # Exportar Excel
-        try:
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df_exibicao.to_excel(writer, index=False, sheet_name='Faturamento')
-            st.download_button(
-                label="📥 Exportar Excel",
-                data=output.getvalue(),
+    TAMANHOS_PAGINA = [50, 100, 250, 500]
+
+    def exibir_tabela_paginada(df_exibicao, chave_selecao, config_colunas):
+        # Só a fatia da página atual é enviada ao navegador; a ordem completa fica na sessão,
+        # então trocar de página não reordena as linhas de novo
+        col_ordem, col_sentido, col_tamanho, col_pagina = st.columns([3, 2, 2, 2])
+        with col_ordem:
+            coluna_ordem = st.selectbox("Ordenar por", ["(ordem original)"] + list(df_exibicao.columns), key="tabela_ordem")
+        with col_sentido:
+            sentido = st.selectbox("Sentido", ["Crescente", "Decrescente"], key="tabela_sentido")
+        with col_tamanho:
+            tamanho_pagina = st.selectbox("Linhas por página", TAMANHOS_PAGINA, key="tabela_tamanho")
+
+        total = len(df_exibicao)
+        total_paginas = max(1, -(-total // tamanho_pagina))
+        if st.session_state.get('tabela_pagina', 1) > total_paginas:
+            st.session_state['tabela_pagina'] = total_paginas
+        with col_pagina:
+            pagina = st.number_input("Página", min_value=1, max_value=total_paginas, step=1, key="tabela_pagina")
+
+        inicio = (pagina - 1) * tamanho_pagina
+        fim = min(inicio + tamanho_pagina, total)
+        if coluna_ordem == "(ordem original)":
+            df_pagina = df_exibicao.iloc[inicio:fim]
+        else:
+            chave_ordem = (chave_selecao, coluna_ordem, sentido)
+            guardado = st.session_state.get('_ordem_tabela')
+            if guardado is None or guardado[0] != chave_ordem:
+                guardado = (chave_ordem, ordenar_posicoes(df_exibicao, coluna_ordem, sentido == "Crescente"))
+                st.session_state['_ordem_tabela'] = guardado
+            df_pagina = df_exibicao.take(guardado[1][inicio:fim])
+
+        st.caption(f"{total:,} registro(s) · exibindo {inicio + 1 if total else 0:,}–{fim:,} · página {pagina} de {total_paginas}".replace(",", "."))
+        with etapa('tabela (serialização)', len(df_pagina)):
+            st.dataframe(
+                df_pagina,
+                use_container_width=True,
+                height=800,
+                hide_index=True,
+                column_config=config_colunas
+            )
+
+    @st.fragment
+    @medido('painel (gráficos e tabela)')
+    def painel_interativo(df_filtrado, resumo, ranking_clientes, ranking_restaurantes, rotulos, col_venc):
+        # Gráficos e tabela formam um fragmento: a seleção em um gráfico reexecuta só este trecho
+        # (figuras já montadas + tabela), sem refazer filtros, cubo e KPIs do restante do script
+        graficos = obter_graficos(resumo, ranking_clientes, ranking_restaurantes, rotulos)
+        evento_cliente = evento_rest = evento_tempo = evento_carteira = None
+
+        col_graf1, col_graf2 = st.columns(2)
+
+        with col_graf1:
+            evento_cliente = st.plotly_chart(graficos['cliente'], use_container_width=True, on_select="rerun")
+
+        with col_graf2:
+            evento_rest = st.plotly_chart(graficos['restaurante'], use_container_width=True, on_select="rerun")
+
+        col_graf3, col_graf4 = st.columns(2)
+
+        with col_graf3:
+            if 'tempo' in graficos:
+                evento_tempo = st.plotly_chart(graficos['tempo'], use_container_width=True, on_select="rerun")
+
+        with col_graf4:
+            if 'carteira' in graficos:
+                evento_carteira = st.plotly_chart(graficos['carteira'], use_container_width=True, on_select="rerun")
+
+        # ----------------------------------------------------
+        # 5. TABELA DE DETALHAMENTO (Com Filtro de Seleção)
+        # ----------------------------------------------------
+        st.markdown("### 📋 Tabela de Dados")
+        df_exibicao = df_filtrado
+
+        # Capturar pontos selecionados nos gráficos para filtrar a tabela
+        sel_clientes = [p['y'] for p in evento_cliente.selection.get('points', [])] if evento_cliente and 'selection' in evento_cliente else []
+        sel_rests = [p['y'] for p in evento_rest.selection.get('points', [])] if evento_rest and 'selection' in evento_rest else []
+        sel_meses = [p['x'] for p in evento_tempo.selection.get('points', [])] if evento_tempo and 'selection' in evento_tempo else []
+        sel_carteiras = [p['customdata'][0] if 'customdata' in p else None for p in evento_carteira.selection.get('points', [])] if evento_carteira and 'selection' in evento_carteira else []
+
+        if sel_clientes: df_exibicao = df_exibicao[df_exibicao['Cliente'].isin(sel_clientes)]
+        if sel_rests: df_exibicao = df_exibicao[df_exibicao['Restaurante'].isin(sel_rests)]
+        if sel_meses: df_exibicao = df_exibicao[df_exibicao['Mes_Ano_Faturamento'].isin(sel_meses)]
+        if any(sel_carteiras): df_exibicao = df_exibicao[df_exibicao['Carteira'].isin(sel_carteiras)]
+
+        df_exibicao = ordenar_colunas(df_exibicao, col_venc)
+
+        busca = st.text_input("🔎 Buscar na tabela", key="tabela_busca", placeholder="Cliente, restaurante, carteira, validação...")
+        df_exibicao = buscar_texto(df_exibicao, busca)
+
+        # --- BOTÕES DE AÇÃO ---
+        # Os arquivos só são gerados quando o usuário pede, em segundo plano, e ficam em cache
+        # pela seleção filtrada (versão dos dados + linhas + colunas)
+        exportador = obter_exportador()
+        chave_selecao = hashlib.sha1(
+            f"{df_original.attrs.get('versao_dados', id(df_original))}|{'|'.join(map(str, df_exibicao.columns))}".encode()
+            + df_exibicao.index.to_numpy().tobytes()
+        ).hexdigest()
+
+        col_btn1, col_btn2, col_btn3 = st.columns([2, 2, 6])
+
+        with col_btn1:
+            area_exportacao(
+                exportador, ('excel', chave_selecao), df_exibicao, gerar_excel,
+                rotulo="📥 Exportar Excel",
                 file_name=f"faturamento_{datetime.date.today()}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
-        except Exception as e:
-            st.error(f"Erro Excel: {e}")
-
-    with col_btn2:
-        def gerar_pdf_profissional(df_input):
-            from fpdf import FPDF
-            
-            # 1. Definir o mapeamento de nomes (De: Nome no código -> Para: Nome no PDF)
-            mapeamento_colunas = {
-                "Restaurante": "Restaurante",
-                "Cliente": "Cliente",
-                "Inicio_Medição": "Inicio Medição",
-                "Fim_Medição": "Fim Medição",
-                "Período_Medição": "Período Medição",
-                "Prazo": "Prazo de Vencimento",
-                "Dia": "Dia de Vencimento"
-            }
-            
-            # Filtrar apenas as colunas que existem
-            cols_originais = [c for c in mapeamento_colunas.keys() if c in df_input.columns]
-            df_pdf = df_input[cols_originais].copy().head(200)
-
-            # 2. Formatar as DATAS para o padrão brasileiro (DD/MM/YYYY)
-            for col_data in ["Inicio_Medição", "Fim_Medição"]:
-                if col_data in df_pdf.columns:
-                    df_pdf[col_data] = pd.to_datetime(df_pdf[col_data]).dt.strftime('%d/%m/%Y')
-
-            pdf = FPDF(orientation='L', unit='mm', format='A4')
-            pdf.add_page()
-            
-            # --- CABEÇALHO DO DOCUMENTO ---
-            pdf.set_fill_color(44, 62, 80)
-            pdf.rect(0, 0, 297, 30, 'F') 
-            pdf.set_text_color(255, 255, 255)
-            pdf.set_font("Arial", 'B', 16)
-            pdf.cell(0, 10, "RELATÓRIO DE FATURAMENTO", ln=True, align='C')
-            pdf.set_font("Arial", size=10)
-            pdf.cell(0, 10, f"Gerado em: {datetime.date.today().strftime('%d/%m/%Y')}", ln=True, align='C')
-            pdf.ln(10)
-
-            # --- CABEÇALHO DA TABELA ---
-            pdf.set_font("Arial", 'B', 8)
-            pdf.set_fill_color(52, 152, 219)
-            pdf.set_text_color(255, 255, 255)
-            
-            # Definir larguras específicas para caber os nomes maiores
-            # Total largura A4 Paisagem útil aprox 280mm
-            larguras = {
-                "Restaurante": 35,
-                "Cliente": 60,
-                "Inicio_Medição": 30,
-                "Fim_Medição": 30,
-                "Período_Medição": 45,
-                "Prazo": 40,
-                "Dia": 40
-            }
-            
-            for col in cols_originais:
-                largura = larguras.get(col, 30)
-                nome_exibicao = mapeamento_colunas[col]
-                pdf.cell(largura, 10, nome_exibicao, 1, 0, 'C', True)
-            pdf.ln()
-
-            # --- DADOS (ZEBRADOS) ---
-            pdf.set_font("Arial", size=8)
-            pdf.set_text_color(0, 0, 0)
-            
-            for i, (_, row) in enumerate(df_pdf.iterrows()):
-                if i % 2 == 0:
-                    pdf.set_fill_color(245, 245, 245)
-                else:
-                    pdf.set_fill_color(255, 255, 255)
-                
-                for col in cols_originais:
-                    largura = larguras.get(col, 30)
-                    # Trata o texto para evitar erros de caracteres e remove o .0 de números se houver
-                    valor = str(row[col]).replace('.0', '')
-                    texto = valor.encode('latin-1', 'ignore').decode('latin-1')
-                    pdf.cell(largura, 8, texto[:25], 1, 0, 'C', True)
-                pdf.ln()
-
-            return bytes(pdf.output())
 
-        try:
-            pdf_bytes = gerar_pdf_profissional(df_exibicao)
-            st.download_button(
-                label="📋 PDF Profissional",
-                data=pdf_bytes,
+        with col_btn2:
+            area_exportacao(
+                exportador, ('pdf', chave_selecao), df_exibicao, gerar_pdf_profissional,
+                rotulo="📋 PDF Profissional",
                 file_name=f"relatorio_faturamento_{datetime.date.today()}.pdf",
-                mime="application/pdf",
-                key="btn_pdf_pro_final"
+                mime="application/pdf"
             )
-        except Exception as e:
-            st.error(f"Erro ao gerar PDF: {e}")
-
-    # --- TABELA VISUAL (Indentada corretamente com 4 espaços) ---
-    config_colunas = {
-        "Valor_Faturamento": st.column_config.NumberColumn("Valor Faturamento", format="R$ %.2f", width="medium"),
-        "Fim_Medição": st.column_config.DateColumn("Fim Medição", format="DD/MM/YYYY"),
-        "Data_Faturamento": st.column_config.DateColumn("Data Faturamento", format="DD/MM/YYYY"),
-        col_venc: st.column_config.DateColumn("Data Vencimento", format="DD/MM/YYYY"),
-        "Inicio_Medição": st.column_config.DateColumn("Início Medição", format="DD/MM/YYYY"),
-        "Tempo": st.column_config.NumberColumn("Tempo", format="%d dias"),
-        "Fat x Venc": st.column_config.NumberColumn("Fat x Venc", format="%d dias")
-    }
 
-    st.dataframe(
-        df_exibicao, 
-        use_container_width=True, 
-        height=800, 
-        hide_index=True,
-        column_config=config_colunas
-    )
\ No newline at end of file
+        # --- TABELA VISUAL (Indentada corretamente com 4 espaços) ---
+        config_colunas = {
+            "Valor_Faturamento": st.column_config.NumberColumn("Valor Faturamento", format="R$ %.2f", width="medium"),
+            "Fim_Medição": st.column_config.DateColumn("Fim Medição", format="DD/MM/YYYY"),
+            "Data_Faturamento": st.column_config.DateColumn("Data Faturamento", format="DD/MM/YYYY"),
+            col_venc: st.column_config.DateColumn("Data Vencimento", format="DD/MM/YYYY"),
+            "Inicio_Medição": st.column_config.DateColumn("Início Medição", format="DD/MM/YYYY"),
+            "Tempo": st.column_config.NumberColumn("Tempo", format="%d dias"),
+            "Fat x Venc": st.column_config.NumberColumn("Fat x Venc", format="%d dias")
+        }
+
+        if st.toggle("Paginar tabela", value=True, key="tabela_paginada"):
+            exibir_tabela_paginada(df_exibicao, chave_selecao, config_colunas)
+        else:
+            with etapa('tabela (serialização)', len(df_exibicao)):
+                st.dataframe(
+                    df_exibicao, 
+                    use_container_width=True, 
+                    height=800, 
+                    hide_index=True,
+                    column_config=config_colunas
+                )
+
+    st.title("📊 Painel Gerencial de Faturamento")
+    st.markdown("---")
+
+    if df_filtrado.empty:
+        st.warning("⚠️ Nenhum dado encontrado na planilha ou para os filtros selecionados.")
+    else:
+        cubo = obter_cubo(df_original, df_original.attrs.get('versao_dados', id(df_original)))
+        with etapa('agregação (KPIs e séries)', len(df_filtrado)):
+            resumo = cubo.resumo(selecoes, periodos)
+
+        faturamento_total = resumo['faturamento_total']
+        contagem_medicoes = resumo['contagem_medicoes']
+        faturamento_medio = (faturamento_total / contagem_medicoes) if contagem_medicoes > 0 else 0.0
+        total_clientes = resumo['total_clientes']
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("💰 Faturamento Total", formatar_moeda(faturamento_total))
+        with col2:
+            st.metric("📈 Ticket Médio", formatar_moeda(faturamento_medio))
+        with col3:
+            st.metric("📋 Total de Medições", contagem_medicoes)
+        with col4:
+            st.metric("👥 Total de Clientes", total_clientes)
+
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        painel_interativo(df_filtrado, resumo, ranking_clientes, ranking_restaurantes, rotulos_evolucao, col_venc)
+        area_relatorios_lote(df_filtrado, col_venc)
+
+# ----------------------------------------------------
+# 6. DESEMPENHO (tempos por etapa)
+# ----------------------------------------------------
+if st.sidebar.toggle("⏱️ Desempenho", key="mostrar_desempenho"):
+    # Esta execução do script primeiro; depois as últimas cargas, exportações e fragmentos do processo
+    outras = [e for e in reversed(ultimas_execucoes()) if e is not execucao_painel and e.nome != 'painel']
+    for registro in [execucao_painel] + outras:
+        st.sidebar.caption(f"**{registro.nome}** · {registro.inicio:%H:%M:%S} · {registro.duracao_ms:,.0f} ms".replace(",", "."))
+        st.sidebar.dataframe(
+            registro.resumo(),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "etapa": "Etapa",
+                "duracao_ms": st.column_config.NumberColumn("ms", format="%.1f"),
+                "linhas": st.column_config.NumberColumn("Linhas", format="%d"),
+                "pico_mb": st.column_config.NumberColumn("Pico (MB)", format="%.1f"),
+                "rss_mb": st.column_config.NumberColumn("RSS (MB)", format="%.0f"),
+                "vezes": None,
+            }
+        )
@@ -0,0 +1,174 @@
+import collections
+import contextlib
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+
+# ----------------------------------------------------
+# MEDIÇÃO DE DESEMPENHO POR ETAPA
+# ----------------------------------------------------
+# Cada etapa (download, leitura, limpeza, classificação, filtros, agregação, gráficos, tabela,
+# exportação) registra duração, linhas e memória. As etapas de uma execução (uma carga de dados,
+# uma execução do script do painel, uma exportação) são agrupadas e, se FATURAMENTO_DESEMPENHO
+# apontar para um arquivo, gravadas nele em JSON Lines (uma etapa por linha).
+# Com FATURAMENTO_DESEMPENHO_MEMORIA=1 o tracemalloc fica ligado e cada etapa informa também o
+# pico de memória alocada; sem ele, só o RSS do processo ao final da etapa (custo desprezível).
+ARQUIVO_LOG = os.environ.get('FATURAMENTO_DESEMPENHO')
+if os.environ.get('FATURAMENTO_DESEMPENHO_MEMORIA') == '1' and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+ULTIMAS_EXECUCOES = collections.OrderedDict()
+LIMITE_EXECUCOES = 32
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def memoria_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Execucao:
+    def __init__(self, nome):
+        self.id = uuid.uuid4().hex[:12]
+        self.nome = nome
+        self.inicio = datetime.datetime.now()
+        self.duracao_ms = None
+        self.etapas = []
+        self._relogio = time.perf_counter()
+        self._pilha = []
+
+    def resumo(self):
+        # Etapas com o mesmo nome (ex.: uma por bloco lido) somadas, na ordem em que apareceram
+        agrupadas = collections.OrderedDict()
+        for etapa in self.etapas:
+            total = agrupadas.setdefault(etapa['etapa'], {'etapa': etapa['etapa'], 'duracao_ms': 0.0, 'linhas': None, 'pico_mb': None, 'rss_mb': None, 'vezes': 0})
+            total['duracao_ms'] += etapa['duracao_ms']
+            total['vezes'] += 1
+            if etapa['linhas'] is not None:
+                total['linhas'] = (total['linhas'] or 0) + etapa['linhas']
+            for campo in ('pico_mb', 'rss_mb'):
+                if etapa[campo] is not None:
+                    total[campo] = max(total[campo] or 0.0, etapa[campo])
+        return list(agrupadas.values())
+
+
+def _execucao_atual():
+    return getattr(_local, 'execucao', None)
+
+
+def iniciar_execucao(nome):
+    _local.execucao = Execucao(nome)
+    return _local.execucao
+
+
+def finalizar_execucao():
+    execucao = _execucao_atual()
+    _local.execucao = None
+    if execucao is None:
+        return None
+    execucao.duracao_ms = round((time.perf_counter() - execucao._relogio) * 1000, 2)
+    with _lock:
+        ULTIMAS_EXECUCOES[execucao.nome] = execucao
+        ULTIMAS_EXECUCOES.move_to_end(execucao.nome)
+        while len(ULTIMAS_EXECUCOES) > LIMITE_EXECUCOES:
+            ULTIMAS_EXECUCOES.popitem(last=False)
+    if ARQUIVO_LOG:
+        registros = [
+            json.dumps({'execucao': execucao.nome, 'id': execucao.id, 'inicio': execucao.inicio.isoformat(timespec='seconds'), **etapa}, ensure_ascii=False)
+            for etapa in execucao.etapas
+        ]
+        try:
+            with _lock, open(ARQUIVO_LOG, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(''.join(r + '\n' for r in registros))
+        except OSError:
+            pass
+    return execucao
+
+
+@contextlib.contextmanager
+def execucao(nome):
+    anterior = _execucao_atual()
+    iniciar_execucao(nome)
+    try:
+        yield _local.execucao
+    finally:
+        finalizar_execucao()
+        _local.execucao = anterior
+
+
+def medido(nome):
+    # Decorador: a função roda dentro de uma execução própria, a menos que já exista uma ativa
+    # na thread (ex.: um fragmento do Streamlit reexecutado sozinho ou junto com o script)
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if _execucao_atual() is not None:
+                return funcao(*args, **kwargs)
+            with execucao(nome):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+@contextlib.contextmanager
+def etapa(nome, linhas=None):
+    # O dicionário devolvido pode receber 'linhas' ao final da etapa (quando só então se sabe
+    # quantas linhas saíram). Sem execução ativa na thread, a etapa vira uma execução própria.
+    atual = _execucao_atual()
+    if atual is None:
+        with execucao(nome):
+            with etapa(nome, linhas) as medicao:
+                yield medicao
+        return
+
+    medicao = {'etapa': nome, 'linhas': linhas, 'duracao_ms': 0.0, 'pico_mb': None, 'rss_mb': None}
+    rastreando = tracemalloc.is_tracing()
+    if rastreando:
+        # Etapas aninhadas: o pico da etapa de fora considera o que já foi visto antes de zerar
+        if atual._pilha:
+            externa = atual._pilha[-1]
+            externa['_pico'] = max(externa.get('_pico', 0), tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    atual._pilha.append(medicao)
+    inicio = time.perf_counter()
+    try:
+        yield medicao
+    finally:
+        medicao['duracao_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+        atual._pilha.pop()
+        if rastreando:
+            pico = max(medicao.pop('_pico', 0), tracemalloc.get_traced_memory()[1])
+            medicao['pico_mb'] = round(pico / 1024 ** 2, 2)
+            if atual._pilha:
+                externa = atual._pilha[-1]
+                externa['_pico'] = max(externa.get('_pico', 0), pico)
+        rss = memoria_rss_mb()
+        medicao['rss_mb'] = round(rss, 1) if rss is not None else None
+        atual.etapas.append(medicao)
+
+
+def medir_iteracao(iteravel, nome):
+    # Mede o tempo gasto em cada next() de um iterador (ex.: leitura de blocos da fonte)
+    iterador = iter(iteravel)
+    while True:
+        with etapa(nome) as medicao:
+            try:
+                item = next(iterador)
+            except StopIteration:
+                return
+            medicao['linhas'] = len(item) if hasattr(item, '__len__') else None
+        yield item
+
+
+def ultimas_execucoes():
+    with _lock:
+        return list(ULTIMAS_EXECUCOES.values())
@@ -0,0 +1,1364 @@
+import pandas as pd
+import numpy as np
+import datetime
+import os
+import io
+import hashlib
+import urllib.request
+import threading
+import sqlite3
+import collections
+import itertools
+import re
+import zipfile
+import concurrent.futures
+import multiprocessing
+import queue
+from formatacao import formatar_data, formatar_dias
+from desempenho import etapa, execucao, medir_iteracao
+
+# ----------------------------------------------------
+# NÚCLEO DO PAINEL DE FATURAMENTO (sem Streamlit)
+# ----------------------------------------------------
+# Carga, limpeza, classificação, filtros, agregação e exportação. Usado pelo dashboard.py e
+# pelo faturamento_report.py (relatórios em lote, ex.: cron); fpdf só é importado ao gerar PDF.
+
+# O DataFrame carregado é compartilhado por todas as sessões do processo; com Copy-on-Write
+# os recortes por sessão são visões e qualquer alteração gera cópia própria, sem tocar no original
+# (a partir do pandas 3.0 esse já é o comportamento padrão)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# ----------------------------------------------------
+# 1. CONEXÃO E LIMPEZA DOS DADOS
+# ----------------------------------------------------
+SHEET_ID = "1NHQWWv1TOnlX4YmKM0zZzIz4DwGt1yj1fd7snt_LFuk"
+# A fonte pode ser trocada pela variável de ambiente (ex.: testes ou uso offline):
+# URL/"gsheet:<id>" da planilha ("gsheet:<id>/<gid>" para uma aba), arquivo .csv, arquivo .parquet
+# ou banco SQLite ("dados.db#tabela"). Para o painel consolidado de várias unidades, use
+# FATURAMENTO_FONTES="Unidade A=gsheet:<id>;Unidade B=gsheet:<id>/<gid>;Teste=dados.csv"
+FONTE_PLANILHA = os.environ.get(
+    'FATURAMENTO_FONTE',
+    f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/export?format=csv"
+)
+
+# Cache em disco do DataFrame já processado (Parquet).
+# Incrementar VERSAO_PROCESSAMENTO sempre que as regras de limpeza ou classificação mudarem.
+PASTA_CACHE = '.cache_faturamento'
+VERSAO_PROCESSAMENTO = 2
+
+# Atualização em segundo plano: os usuários sempre recebem o último dado válido na hora,
+# enquanto uma thread baixa a planilha de novo a cada INTERVALO_ATUALIZACAO segundos
+INTERVALO_ATUALIZACAO = 60
+TIMEOUT_DOWNLOAD = 30
+TENTATIVAS_DOWNLOAD = 3
+ESPERA_INICIAL_TENTATIVA = 2
+
+# Fontes grandes são lidas e limpas em blocos de linhas, sem manter várias cópias brutas em memória
+TAMANHO_BLOCO = 50_000
+
+# Exportação Excel: motor usado por padrão e linhas convertidas por vez
+MOTORES_EXCEL = ('xlsxwriter', 'openpyxl')
+MOTOR_EXCEL = os.environ.get('FATURAMENTO_MOTOR_EXCEL', 'xlsxwriter')
+BLOCO_EXCEL = 5_000
+
+def hash_arquivo(*caminhos):
+    chave = hashlib.sha256()
+    for caminho in caminhos:
+        if not os.path.exists(caminho):
+            continue
+        with open(caminho, 'rb') as arquivo:
+            for parte in iter(lambda: arquivo.read(1024 * 1024), b''):
+                chave.update(parte)
+    return chave.hexdigest()
+
+class FonteCSV:
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def identidade(self):
+        return f"csv:{os.path.abspath(self.caminho)}"
+
+    def impressao_digital(self):
+        return hash_arquivo(self.caminho)
+
+    def ler_blocos(self, tamanho_bloco=TAMANHO_BLOCO):
+        yield from pd.read_csv(self.caminho, chunksize=tamanho_bloco)
+
+class FonteGoogleSheets:
+    def __init__(self, url, timeout=TIMEOUT_DOWNLOAD):
+        self.url = url
+        self.timeout = timeout
+        self._conteudo = None
+
+    def _baixar(self):
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as resposta:
+            return resposta.read()
+
+    def identidade(self):
+        return self.url
+
+    def impressao_digital(self):
+        # O download acontece uma única vez: os mesmos bytes servem para a chave e para a leitura
+        self._conteudo = self._baixar()
+        return hashlib.sha256(self._conteudo).hexdigest()
+
+    def ler_blocos(self, tamanho_bloco=TAMANHO_BLOCO):
+        conteudo = self._conteudo if self._conteudo is not None else self._baixar()
+        self._conteudo = None
+        yield from pd.read_csv(io.BytesIO(conteudo), chunksize=tamanho_bloco)
+
+class FonteParquet:
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def identidade(self):
+        return f"parquet:{os.path.abspath(self.caminho)}"
+
+    def impressao_digital(self):
+        return hash_arquivo(self.caminho)
+
+    def ler_blocos(self, tamanho_bloco=TAMANHO_BLOCO):
+        import pyarrow.parquet as pq
+        arquivo = pq.ParquetFile(self.caminho)
+        if arquivo.metadata.num_rows == 0:
+            yield arquivo.schema_arrow.empty_table().to_pandas()
+            return
+        for lote in arquivo.iter_batches(batch_size=tamanho_bloco):
+            yield lote.to_pandas()
+
+class FonteSQLite:
+    def __init__(self, caminho, tabela='faturamento'):
+        self.caminho = caminho
+        self.tabela = tabela
+
+    def identidade(self):
+        return f"sqlite:{os.path.abspath(self.caminho)}#{self.tabela}"
+
+    def impressao_digital(self):
+        return hash_arquivo(self.caminho, f"{self.caminho}-wal")
+
+    def ler_blocos(self, tamanho_bloco=TAMANHO_BLOCO):
+        with sqlite3.connect(f"file:{self.caminho}?mode=ro", uri=True) as conexao:
+            consulta = f'SELECT * FROM "{self.tabela}"'
+            yield from pd.read_sql_query(consulta, conexao, chunksize=tamanho_bloco)
+
+class FonteMultipla:
+    # Várias planilhas (uma por unidade/aba) consolidadas em um único DataFrame. Downloads e
+    # leituras acontecem em paralelo, então o tempo total fica próximo ao da fonte mais lenta,
+    # e os blocos de uma fonte chegam ao pipeline sem esperar as outras terminarem.
+    # Cada linha recebe a coluna "Origem" com o rótulo da fonte.
+    def __init__(self, fontes, max_workers=8):
+        self.fontes = {rotulo: criar_fonte(fonte) for rotulo, fonte in fontes.items()}
+        self.max_workers = max_workers
+
+    def _em_paralelo(self, funcao):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fonte') as executor:
+            resultados = {rotulo: executor.submit(funcao, fonte) for rotulo, fonte in self.fontes.items()}
+            return {rotulo: tarefa.result() for rotulo, tarefa in resultados.items()}
+
+    def identidade(self):
+        return 'multipla:' + ';'.join(f"{rotulo}={fonte.identidade()}" for rotulo, fonte in self.fontes.items())
+
+    def impressao_digital(self):
+        chave = hashlib.sha256()
+        for rotulo, digital in self._em_paralelo(lambda fonte: fonte.impressao_digital()).items():
+            chave.update(f"{rotulo}|{digital}|".encode())
+        return chave.hexdigest()
+
+    def ler_blocos(self, tamanho_bloco=TAMANHO_BLOCO):
+        # Cada fonte é lida pelo seu próprio ler_blocos em uma thread, e os blocos seguem para o
+        # pipeline à medida que chegam (por uma fila limitada, sem ler fontes inteiras antes).
+        # Os blocos são alinhados à união das colunas das fontes (com o vencimento sempre como
+        # "Data _Vencimento"); todos os blocos de uma fonte têm as colunas do primeiro, então só
+        # até o primeiro bloco de cada fonte chegar os blocos ficam retidos
+        fila = queue.Queue(maxsize=2 * len(self.fontes))
+        parar = threading.Event()
+        fim = object()
+
+        def entregar(item):
+            while not parar.is_set():
+                try:
+                    fila.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def ler(rotulo, fonte):
+            try:
+                for bloco in fonte.ler_blocos(tamanho_bloco):
+                    if not entregar((rotulo, bloco)):
+                        return
+            except Exception as e:
+                entregar((rotulo, e))
+            else:
+                entregar((rotulo, fim))
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fonte')
+        try:
+            for rotulo, fonte in self.fontes.items():
+                executor.submit(ler, rotulo, fonte)
+            lendo = set(self.fontes)
+            primeiras_colunas = {}
+            colunas = None
+            retidos = []
+            while lendo:
+                rotulo, bloco = fila.get()
+                if isinstance(bloco, Exception):
+                    raise bloco
+                if bloco is fim:
+                    lendo.discard(rotulo)
+                    primeiras_colunas.setdefault(rotulo, [])
+                else:
+                    bloco.columns = bloco.columns.str.strip()
+                    bloco.rename(columns={'Data_Vencimento': 'Data _Vencimento'}, inplace=True)
+                    primeiras_colunas.setdefault(rotulo, list(bloco.columns))
+                    retidos.append((rotulo, bloco))
+                if colunas is None and len(primeiras_colunas) == len(self.fontes):
+                    colunas = ['Origem']
+                    for rotulo_fonte in self.fontes:
+                        colunas += [c for c in primeiras_colunas[rotulo_fonte] if c not in colunas]
+                if colunas is not None:
+                    while retidos:
+                        rotulo, bloco = retidos.pop(0)
+                        yield bloco.assign(Origem=rotulo).reindex(columns=colunas)
+        finally:
+            # Fim normal, erro ou leitura interrompida: as threads param no próximo bloco
+            parar.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def ler_fontes(texto):
+    # "Rótulo=fonte;Rótulo=fonte" -> {rótulo: fonte}
+    fontes = {}
+    for item in texto.replace('\n', ';').split(';'):
+        rotulo, separador, fonte = item.partition('=')
+        if item.strip():
+            if not separador or not rotulo.strip() or not fonte.strip():
+                raise ValueError(f"fonte inválida (use Rótulo=fonte): {item.strip()!r}")
+            fontes[rotulo.strip()] = fonte.strip()
+    return fontes
+
+if os.environ.get('FATURAMENTO_FONTES'):
+    FONTE_PLANILHA = ler_fontes(os.environ['FATURAMENTO_FONTES'])
+
+def criar_fonte(fonte):
+    if isinstance(fonte, dict):
+        return FonteMultipla(fonte)
+    if not isinstance(fonte, str):
+        return fonte
+    if fonte.startswith('gsheet:'):
+        planilha, _, aba = fonte[len('gsheet:'):].partition('/')
+        fonte = f"https://docs.google.com/spreadsheets/d/{planilha}/export?format=csv" + (f"&gid={aba}" if aba else '')
+    if fonte.startswith(('http://', 'https://')):
+        return FonteGoogleSheets(fonte)
+
+    caminho, _, tabela = fonte.partition('#')
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao == '.parquet':
+        return FonteParquet(caminho)
+    if extensao in ('.db', '.sqlite', '.sqlite3'):
+        return FonteSQLite(caminho, tabela or 'faturamento')
+    return FonteCSV(caminho)
+
+def pasta_cache(fonte):
+    # Cada fonte (arquivo, planilha ou conjunto de unidades) tem a sua subpasta em PASTA_CACHE:
+    # carregar outra fonte a partir da mesma pasta de trabalho não descarta o cache desta
+    return os.path.join(PASTA_CACHE, hashlib.sha256(fonte.identidade().encode()).hexdigest()[:16])
+
+def caminho_cache(fonte, impressao_digital):
+    # A validação depende da data de hoje (medições ainda abertas), por isso ela entra na chave
+    chave = hashlib.sha256()
+    chave.update(impressao_digital.encode())
+    chave.update(f"v{VERSAO_PROCESSAMENTO}|{datetime.date.today().isoformat()}".encode())
+    return os.path.join(pasta_cache(fonte), f"{chave.hexdigest()}.parquet")
+
+def ler_cache(caminho):
+    if not os.path.exists(caminho):
+        return None
+    try:
+        df = pd.read_parquet(caminho)
+    except Exception:
+        return None
+    df.attrs['versao_dados'] = versao_dados(caminho)
+    return df
+
+def versao_dados(caminho):
+    # Identifica a versão dos dados carregados (o nome do arquivo de cache é a chave)
+    return os.path.splitext(os.path.basename(caminho))[0]
+
+def salvar_cache(df, caminho):
+    try:
+        pasta = os.path.dirname(caminho)
+        os.makedirs(pasta, exist_ok=True)
+        temporario = f"{caminho}.tmp"
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, caminho)
+        # Mantém apenas a versão mais recente desta fonte em disco
+        for nome in os.listdir(pasta):
+            antigo = os.path.join(pasta, nome)
+            if antigo != caminho and nome.endswith('.parquet'):
+                os.remove(antigo)
+    except Exception:
+        pass
+
+def limpar_moeda(serie):
+    # Versão vetorizada: "R$ 1.234,56", "1234,56", números e vazios em uma única passada
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.fillna(0.0).astype(float), 0
+
+    texto = serie.astype(str).where(serie.notna(), '').str.replace('R$', '', regex=False).str.strip()
+    tem_virgula = texto.str.contains(',', regex=False)
+    tem_ponto = texto.str.contains('.', regex=False)
+    texto = texto.mask(tem_virgula & tem_ponto, texto.str.replace('.', '', regex=False))
+    texto = texto.str.replace(',', '.', regex=False)
+
+    valores = pd.to_numeric(texto, errors='coerce')
+    invalidos = valores.isna() & (texto != '')
+    return valores.fillna(0.0).astype(float), int(invalidos.sum())
+
+def processar_dados(df):
+    df.columns = df.columns.str.strip()
+
+    if 'Valor_Faturamento' in df.columns:
+        df['Valor_Faturamento'], df.attrs['valores_invalidos'] = limpar_moeda(df['Valor_Faturamento'])
+    else:
+        df['Valor_Faturamento'] = 0.0
+        df.attrs['valores_invalidos'] = 0
+
+    col_vencimento = 'Data _Vencimento' if 'Data _Vencimento' in df.columns else 'Data_Vencimento'
+    colunas_data = ['Fim_Medição', 'Data_Faturamento', col_vencimento, 'Inicio_Medição']
+    for col in colunas_data:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], dayfirst=True, errors='coerce')
+        
+    if 'Data_Faturamento' in df.columns and 'Fim_Medição' in df.columns:
+        df['Tempo'] = (df['Data_Faturamento'] - df['Fim_Medição']).dt.days
+        
+    if col_vencimento in df.columns and 'Data_Faturamento' in df.columns:
+        df['Fat x Venc'] = (df[col_vencimento] - df['Data_Faturamento']).dt.days
+    
+    if 'Data_Faturamento' in df.columns:
+        df['Mes_Ano_Faturamento'] = df['Data_Faturamento'].dt.strftime('%m/%Y').fillna('Sem Data')
+    if col_vencimento in df.columns:
+        df['Mes_Ano_Vencimento'] = df[col_vencimento].dt.strftime('%m/%Y').fillna('Sem Data')
+    
+    colunas_texto = ['Restaurante', 'Cliente', 'Validação_Cliente', 'Medição_Encerrada', 'Carteira']
+    for col in colunas_texto:
+        if col in df.columns:
+            df[col] = df[col].fillna('Não Informado').astype(str).str.strip()
+            
+    if 'Carteira' in df.columns:
+        df['Carteira'] = df['Carteira'].replace(['Depósito em Conta', 'Deposito em Conta', 'DEPÓSITO EM CONTA'], 'Transferência Bancária')
+
+    def classificar_validacao(df):
+        # Versão vetorizada: cada regra vira uma máscara booleana sobre a coluna inteira
+        vazio = pd.Series('', index=df.index)
+        carteira = df['Carteira'].astype(str).str.strip() if 'Carteira' in df.columns else vazio
+        encerrada = df['Medição_Encerrada'].astype(str).str.strip() if 'Medição_Encerrada' in df.columns else vazio
+        fim_med = df['Fim_Medição'] if 'Fim_Medição' in df.columns else pd.Series(pd.NaT, index=df.index)
+        hoje = pd.Timestamp.today()
+
+        sem_funcionamento = carteira == 'Sem Funcionamento'
+        aguardando = (fim_med.notna() & (fim_med > hoje)) | (encerrada.str.lower() == 'ok')
+
+        carteira_preenchida = ~carteira.isin(['Não Informado', '', 'nan', 'None'])
+        fat_preenchido = df['Data_Faturamento'].notna() if 'Data_Faturamento' in df.columns else False
+        venc_preenchido = df[col_vencimento].notna() if col_vencimento in df.columns else False
+        valor_preenchido = df['Valor_Faturamento'] > 0.0
+        concluido = fat_preenchido & venc_preenchido & valor_preenchido & carteira_preenchida
+
+        return np.select(
+            [sem_funcionamento, aguardando, concluido],
+            ['🚫 Sem Funcionamento', '⏳ Aguardando encerramento', '✅ Concluído'],
+            default='⚠️ Pendente'
+        )
+
+    with etapa('classificação (Validação)', len(df)):
+        df['Validação'] = classificar_validacao(df)
+
+    def validar_vencimento(df):
+        # Versão vetorizada: os textos de Prazo/Dia são interpretados uma única vez por coluna
+        # e cada regra vira uma máscara; a ordem das condições em np.select é a ordem das regras
+        sem_data = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+        venc_real = df[col_vencimento] if col_vencimento in df.columns else sem_data
+        dt_fat = df['Data_Faturamento'] if 'Data_Faturamento' in df.columns else sem_data
+        fim_med = df['Fim_Medição'] if 'Fim_Medição' in df.columns else sem_data
+        inicio_med = df['Inicio_Medição'] if 'Inicio_Medição' in df.columns else sem_data
+
+        dia_texto = df['Dia'].astype(str).where(df['Dia'].notna(), '').str.strip().str.lower()
+        if 'Prazo' in df.columns:
+            prazo_texto = df['Prazo'].astype(str).where(df['Prazo'].notna(), '')
+        else:
+            prazo_texto = pd.Series('', index=df.index)
+        prazo_dias = pd.to_numeric(prazo_texto.str.extract(r'(\d+)', expand=False), errors='coerce')
+        numero_dia = pd.to_numeric(dia_texto.str.extract(r'(\d+)', expand=False), errors='coerce')
+        fat_venc = (venc_real - dt_fat).dt.days
+
+        dia_vazio = dia_texto.isin(['', 'nan', 'none', 'não informado'])
+        prazo_antecipado = fat_venc.notna() & prazo_dias.notna() & (fat_venc < prazo_dias)
+        texto_antecipado = dia_texto.str.contains('antecipado', regex=False)
+
+        # O primeiro nome de dia da semana encontrado no texto define o dia esperado
+        dias_semana = {'segunda': 0, 'terça': 1, 'terca': 1, 'quarta': 2, 'quinta': 3, 'sexta': 4, 'sábado': 5, 'sabado': 5, 'domingo': 6}
+        dia_semana_alvo = pd.Series(np.select(
+            [dia_texto.str.contains(nome, regex=False) for nome in dias_semana],
+            list(dias_semana.values()),
+            default=-1
+        ), index=df.index)
+        tem_dia_semana = dia_semana_alvo >= 0
+
+        # Dia do mês: vence no mês do fechamento, ou no seguinte se o dia já passou (com virada de ano)
+        fim_dia = fim_med.values.astype('datetime64[D]')
+        fim_mes = fim_med.values.astype('datetime64[M]')
+        dia_do_fechamento = (fim_dia - fim_mes.astype('datetime64[D]')).astype('int64') + 1
+        dia_alvo = numero_dia.fillna(1).clip(upper=32).to_numpy(dtype='int64')
+        mes_alvo = fim_mes + (dia_alvo <= dia_do_fechamento).astype('timedelta64[M]')
+        inicio_mes_alvo = mes_alvo.astype('datetime64[D]')
+        dias_no_mes = ((mes_alvo + 1).astype('datetime64[D]') - inicio_mes_alvo).astype('int64')
+        data_alvo = inicio_mes_alvo + (np.minimum(dia_alvo, dias_no_mes) - 1).astype('timedelta64[D]')
+        v_date = venc_real.values.astype('datetime64[D]')
+        fora_do_intervalo = data_alvo > np.datetime64(pd.Timestamp.max.date())
+
+        dia_zero = numero_dia == 0
+        sem_fechamento = venc_real.isna() | fim_med.isna()
+
+        condicoes = [
+            dia_vazio,
+            prazo_antecipado,
+            texto_antecipado & (dt_fat.isna() | inicio_med.isna()),
+            texto_antecipado & (dt_fat < inicio_med),
+            texto_antecipado,
+            tem_dia_semana & venc_real.isna(),
+            tem_dia_semana & (venc_real.dt.weekday == dia_semana_alvo),
+            tem_dia_semana,
+            numero_dia.isna(),
+            dia_zero & (fat_venc.isna() | prazo_dias.isna()),
+            dia_zero & (fat_venc == prazo_dias),
+            dia_zero,
+            sem_fechamento,
+            fora_do_intervalo,
+            v_date == data_alvo,
+            v_date > data_alvo,
+        ]
+        resultados = [
+            '➖ Não Avaliado',
+            '🚀 Antecipado',
+            '➖ Não Avaliado',
+            '🚀 Antecipado',
+            '❌ Não Antecipado',
+            '➖ Não Avaliado',
+            '✅ Dentro do Prazo',
+            '❌ Depois do Prazo',
+            '➖ Não Avaliado',
+            '➖ Não Avaliado',
+            '✅ Dentro do Prazo',
+            '❌ Depois do Prazo',
+            '➖ Não Avaliado',
+            '➖ Erro no Cálculo',
+            '✅ Dentro do Prazo',
+            '❌ Depois do Prazo',
+        ]
+        return np.select(condicoes, resultados, default='🚀 Antecipado')
+
+    if 'Dia' in df.columns:
+        with etapa('classificação (Vencimento)', len(df)):
+            df['Validação do Vencimento'] = validar_vencimento(df)
+
+    return df
+
+def arquivo_snapshot(fonte):
+    pasta = pasta_cache(fonte)
+    if not os.path.isdir(pasta):
+        return None
+    arquivos = [os.path.join(pasta, n) for n in os.listdir(pasta) if n.endswith('.parquet')]
+    if not arquivos:
+        return None
+    return max(arquivos, key=os.path.getmtime)
+
+def ler_snapshot(caminho, fonte):
+    # Só vale o snapshot gravado por esta mesma fonte e com as regras de processamento atuais
+    df = ler_cache(caminho)
+    if df is None or df.attrs.get('fonte') != fonte.identidade() or df.attrs.get('versao') != VERSAO_PROCESSAMENTO:
+        return None
+    return df
+
+def ultimo_snapshot(fonte):
+    # O último arquivo salvo para a fonte é a base para o processamento incremental
+    caminho = arquivo_snapshot(fonte)
+    return ler_snapshot(caminho, fonte) if caminho else None
+
+def processar_bloco(bruto, hashes, anterior, posicoes_anteriores):
+    novas = np.ones(len(bruto), dtype=bool)
+    if posicoes_anteriores is not None:
+        posicoes = posicoes_anteriores.reindex(hashes)
+        novas = posicoes.isna().to_numpy()
+
+    if novas.all():
+        with etapa('processamento (limpeza + classificação)', len(bruto)):
+            return processar_dados(bruto.copy())
+
+    reaproveitadas = anterior.iloc[posicoes[~novas].astype('int64').to_numpy()].drop(columns='_hash_linha')
+    reaproveitadas.index = np.flatnonzero(~novas)
+    partes = [reaproveitadas]
+    if novas.any():
+        with etapa('processamento (limpeza + classificação)', int(novas.sum())):
+            processadas = processar_dados(bruto[novas].copy())
+        processadas.index = np.flatnonzero(novas)
+        partes.append(processadas[reaproveitadas.columns])
+    return pd.concat(partes).sort_index().reset_index(drop=True)
+
+def processar_incremental(blocos, anterior=None):
+    # Cada linha da planilha recebe uma impressão digital; só as linhas novas ou editadas
+    # desde o último processamento (o snapshot 'anterior') passam pelo pipeline, as demais
+    # são reaproveitadas. A fonte é consumida bloco a bloco e só os blocos já processados
+    # ficam em memória.
+    posicoes_anteriores = None
+    assinatura = None
+    partes, hashes, valores_invalidos = [], [], 0
+
+    for bruto in medir_iteracao(blocos, 'leitura da fonte'):
+        bruto.columns = bruto.columns.str.strip()
+        if assinatura is None:
+            assinatura = {
+                'versao': VERSAO_PROCESSAMENTO,
+                'data': datetime.date.today().isoformat(),
+                'colunas_brutas': list(bruto.columns),
+            }
+            compativel = (
+                anterior is not None
+                and '_hash_linha' in anterior.columns
+                and all(anterior.attrs.get(k) == v for k, v in assinatura.items())
+            )
+            if compativel:
+                posicoes_anteriores = pd.Series(np.arange(len(anterior)), index=anterior['_hash_linha'].to_numpy())
+                posicoes_anteriores = posicoes_anteriores[~posicoes_anteriores.index.duplicated()]
+
+        hashes_bloco = pd.util.hash_pandas_object(bruto, index=False).to_numpy()
+        partes.append(processar_bloco(bruto, hashes_bloco, anterior, posicoes_anteriores))
+        hashes.append(hashes_bloco)
+        if 'Valor_Faturamento' in bruto.columns:
+            valores_invalidos += limpar_moeda(bruto['Valor_Faturamento'])[1]
+
+    if not partes:
+        return pd.DataFrame()
+
+    df = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+    df['_hash_linha'] = np.concatenate(hashes)
+    df.attrs = {'valores_invalidos': valores_invalidos, **assinatura}
+    return df
+
+# Colunas de rótulos com poucos valores distintos: guardadas como categóricas
+COLUNAS_CATEGORICAS = [
+    'Origem', 'Restaurante', 'Cliente', 'Carteira', 'Validação_Cliente', 'Medição_Encerrada',
+    'Validação', 'Validação do Vencimento', 'Mes_Ano_Faturamento', 'Mes_Ano_Vencimento',
+    'Prazo', 'Dia'
+]
+COLUNAS_DIAS = ['Tempo', 'Fat x Venc']
+# Colunas "MM/AAAA": as categorias ficam em ordem cronológica ('Sem Data' por último), então os
+# códigos já servem de chave de ordenação e agrupamento por mês, sem reconverter o texto em data
+COLUNAS_MES = ['Mes_Ano_Faturamento', 'Mes_Ano_Vencimento']
+
+def ordenar_meses(df):
+    # Só as categorias (uma por mês) são convertidas em data, e uma vez por carga
+    for col in COLUNAS_MES:
+        if col in df.columns:
+            rotulos = list(df[col].astype('category').cat.categories)
+            datas = pd.to_datetime(pd.Series(rotulos, dtype=object), format='%m/%Y', errors='coerce').to_numpy()
+            ordem = [rotulos[i] for i in np.argsort(datas, kind='stable')]
+            df[col] = df[col].astype(pd.CategoricalDtype(ordem, ordered=True))
+    return df
+
+def compactar_tipos(df):
+    # Reduz a memória do DataFrame carregado: categorias para rótulos e inteiros pequenos
+    # (anuláveis) para contagens de dias. Registra o uso de memória antes e depois em df.attrs.
+    memoria_antes = int(df.memory_usage(deep=True).sum())
+
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    ordenar_meses(df)
+
+    for col in COLUNAS_DIAS:
+        if col in df.columns:
+            maior = df[col].abs().max()
+            df[col] = df[col].astype('Int16' if pd.isna(maior) or maior < 2 ** 15 else 'Int32')
+
+    df.attrs['memoria_antes'] = memoria_antes
+    df.attrs['memoria_depois'] = int(df.memory_usage(deep=True).sum())
+    return df
+
+def carregar_dados(fonte=FONTE_PLANILHA, atual=None):
+    fonte = criar_fonte(fonte)
+    with etapa('download / impressão digital da fonte'):
+        caminho = caminho_cache(fonte, fonte.impressao_digital())
+
+    # Troca versionada: se a versão não mudou, devolve o DataFrame já compartilhado (e os
+    # índices/cubos montados sobre ele) em vez de reler o cache; uma versão nova substitui
+    # a referência e as sessões em andamento terminam a execução com a anterior
+    if atual is not None and atual.attrs.get('versao_dados') == versao_dados(caminho):
+        return atual
+
+    with etapa('cache (leitura)') as medicao:
+        df = ler_cache(caminho)
+        medicao['linhas'] = None if df is None else len(df)
+    if df is None:
+        df = processar_incremental(fonte.ler_blocos(), ultimo_snapshot(fonte))
+        with etapa('compactação de tipos', len(df)):
+            df = compactar_tipos(df)
+        df.attrs['versao_dados'] = versao_dados(caminho)
+        df.attrs['fonte'] = fonte.identidade()
+        with etapa('cache (gravação)', len(df)):
+            salvar_cache(df, caminho)
+    return df.drop(columns='_hash_linha', errors='ignore')
+
+class AtualizadorPlanilha:
+    def __init__(self, fonte, intervalo=INTERVALO_ATUALIZACAO):
+        self.fonte = fonte
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._lock_atualizacao = threading.Lock()
+        self._parar = threading.Event()
+        self._pronto = threading.Event()
+        self._agora = threading.Event()
+        self.df = None
+        self.atualizado_em = None
+        self.ultimo_erro = None
+        # Tentativas concluídas (com sucesso ou não) e a tentativa em curso, para o painel
+        # acompanhar uma recarga pedida pelo usuário sem esperar por ela
+        self.atualizacoes = 0
+        self.tentativa = None
+
+        # Na partida a frio, o último snapshot em disco desta fonte (gravado com a versão atual do
+        # processamento) já pode ser servido enquanto o download ocorre
+        fonte_snapshot = criar_fonte(fonte)
+        caminho = arquivo_snapshot(fonte_snapshot)
+        snapshot = ler_snapshot(caminho, fonte_snapshot) if caminho else None
+        if snapshot is not None:
+            self.df = snapshot.drop(columns='_hash_linha', errors='ignore')
+            self.atualizado_em = datetime.datetime.fromtimestamp(os.path.getmtime(caminho))
+            self._pronto.set()
+
+        self._thread = threading.Thread(target=self._executar, name='atualizador-planilha', daemon=True)
+        self._thread.start()
+
+    def atualizar(self):
+        # Novas tentativas com espera exponencial; em caso de falha o último dado válido é mantido
+        with self._lock_atualizacao:
+            espera = ESPERA_INICIAL_TENTATIVA
+            for tentativa in range(TENTATIVAS_DOWNLOAD):
+                self.tentativa = tentativa + 1
+                try:
+                    with execucao('carga de dados'):
+                        df = carregar_dados(self.fonte, atual=self.df)
+                except Exception as e:
+                    with self._lock:
+                        self.ultimo_erro = e
+                    if tentativa < TENTATIVAS_DOWNLOAD - 1 and not self._parar.wait(espera):
+                        espera *= 2
+                        continue
+                    break
+                else:
+                    with self._lock:
+                        self.df = df
+                        self.atualizado_em = datetime.datetime.now()
+                        self.ultimo_erro = None
+                    break
+            with self._lock:
+                self.tentativa = None
+                self.atualizacoes += 1
+            self._pronto.set()
+
+    def solicitar_atualizacao(self):
+        # Antecipa a próxima atualização da thread de segundo plano e retorna na hora; o valor
+        # devolvido é comparado com 'atualizacoes' para saber quando ela terminou
+        with self._lock:
+            pedido = self.atualizacoes + (1 if self.tentativa is None else 2)
+        self._agora.set()
+        return pedido
+
+    def _executar(self):
+        while not self._parar.is_set():
+            self.atualizar()
+            self._agora.wait(self.intervalo)
+            self._agora.clear()
+
+    def parar(self):
+        self._parar.set()
+        self._agora.set()
+
+    def obter(self):
+        # Só bloqueia se nunca houve nenhum dado (primeiro download sem snapshot em disco)
+        self._pronto.wait()
+        with self._lock:
+            return self.df, self.atualizado_em, self.ultimo_erro
+
+def formatar_idade(atualizado_em):
+    segundos = int((datetime.datetime.now() - atualizado_em).total_seconds())
+    if segundos < 60:
+        return f"{segundos} s"
+    if segundos < 3600:
+        return f"{segundos // 60} min"
+    if segundos < 86400:
+        return f"{segundos // 3600} h"
+    return formatar_dias(segundos // 86400)
+
+# ----------------------------------------------------
+# 2. FILTROS
+# ----------------------------------------------------
+class IndiceFiltros:
+    # Construído uma vez por carga de dados: códigos inteiros por valor para cada coluna de
+    # múltipla escolha e ordinais de dia (int64) para as colunas de data. Todos os filtros
+    # ativos viram uma única máscara booleana, aplicada com um só take.
+    COLUNAS_SELECAO = ['Origem', 'Restaurante', 'Cliente', 'Validação_Cliente', 'Validação',
+                       'Validação do Vencimento', 'Medição_Encerrada', 'Carteira']
+
+    def __init__(self, df, colunas_data):
+        self.total_linhas = len(df)
+        self.codigos = {}
+        self.categorias = {}
+        for col in self.COLUNAS_SELECAO:
+            if col not in df.columns:
+                continue
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                codigos, categorias = df[col].cat.codes.to_numpy(), df[col].cat.categories
+            else:
+                codigos, categorias = pd.factorize(df[col])
+            self.codigos[col] = codigos
+            self.categorias[col] = pd.Index(categorias)
+
+        self.dias = {}
+        self.limites = {}
+        for col in colunas_data:
+            if col not in df.columns:
+                continue
+            valores = df[col].to_numpy().astype('datetime64[D]')
+            self.dias[col] = valores.astype('int64')
+            validos = valores[~np.isnat(valores)]
+            if validos.size:
+                self.limites[col] = (validos.min().item(), validos.max().item())
+
+    def limites_data(self, coluna):
+        if coluna in self.limites:
+            return self.limites[coluna]
+        hoje = datetime.date.today()
+        return hoje, hoje
+
+    def valores(self, coluna):
+        if coluna not in self.codigos:
+            return []
+        presentes = np.unique(self.codigos[coluna])
+        presentes = presentes[presentes >= 0]
+        return sorted(x for x in self.categorias[coluna][presentes] if x != 'Não Informado' and x != 'Sem Data')
+
+    def linhas(self, selecoes, periodos):
+        # Retorna as posições das linhas que passam em todos os filtros (None = sem filtro)
+        mascara = None
+        for col, escolhidos in selecoes.items():
+            if not escolhidos or col not in self.codigos:
+                continue
+            tabela = np.zeros(len(self.categorias[col]) + 1, dtype=bool)
+            posicoes = self.categorias[col].get_indexer(escolhidos)
+            tabela[posicoes[posicoes >= 0]] = True
+            parcial = tabela[self.codigos[col]]
+            mascara = parcial if mascara is None else mascara & parcial
+
+        for col, (inicio, fim) in periodos.items():
+            if col not in self.dias:
+                continue
+            dias = self.dias[col]
+            inicio = np.datetime64(inicio, 'D').astype('int64')
+            fim = np.datetime64(fim, 'D').astype('int64')
+            parcial = (dias >= inicio) & (dias <= fim)
+            mascara = parcial if mascara is None else mascara & parcial
+
+        return None if mascara is None else np.flatnonzero(mascara)
+
+def coluna_vencimento(df):
+    return 'Data _Vencimento' if 'Data _Vencimento' in df.columns else 'Data_Vencimento'
+
+def filtrar(df, selecoes=None, periodos=None, indice=None):
+    # Aplica os mesmos filtros do painel: selecoes {coluna: [valores]} e periodos {coluna: (início, fim)}
+    indice = indice if indice is not None else IndiceFiltros(df, ('Fim_Medição', 'Data_Faturamento', coluna_vencimento(df)))
+    linhas = indice.linhas(selecoes or {}, periodos or {})
+    return df if linhas is None else df.take(linhas)
+
+# ----------------------------------------------------
+# 3. EXPORTAÇÃO (Excel / PDF)
+# ----------------------------------------------------
+def blocos_excel(df_export, tamanho_bloco=BLOCO_EXCEL):
+    # Converte as linhas para valores Python um bloco por vez (a memória fica no tamanho do bloco,
+    # não da exportação): datas viram o número serial do Excel, vazios viram None.
+    # Devolve o tipo de cada coluna ('data', 'numero' ou 'texto') e um gerador de blocos de linhas
+    tipos = []
+    for col in df_export.columns:
+        serie = df_export[col]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            tipos.append('data')
+        elif pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            tipos.append('numero')
+        else:
+            tipos.append('texto')
+
+    def converter(serie, tipo):
+        if tipo == 'data':
+            serie = (serie - pd.Timestamp('1899-12-30')) / pd.Timedelta(days=1)
+        elif tipo == 'numero':
+            serie = serie.astype('float64')
+        else:
+            serie = serie.astype(str).where(serie.notna())
+        return serie.to_numpy(dtype=object, na_value=None)
+
+    def gerar():
+        for inicio in range(0, len(df_export), tamanho_bloco):
+            bloco = df_export.iloc[inicio:inicio + tamanho_bloco]
+            colunas = [converter(bloco.iloc[:, i], tipo) for i, tipo in enumerate(tipos)]
+            yield zip(*colunas)
+
+    return tipos, gerar()
+
+def gerar_excel(df_export, motor=None):
+    # motor: 'xlsxwriter' (padrão) ou 'openpyxl'; o padrão pode ser trocado por FATURAMENTO_MOTOR_EXCEL.
+    # Os dois gravam em streaming, bloco a bloco, sem montar a planilha inteira em memória
+    motor = motor or MOTOR_EXCEL
+    if motor not in MOTORES_EXCEL:
+        raise ValueError(f"motor de Excel desconhecido: {motor!r} (use {' ou '.join(MOTORES_EXCEL)})")
+    output = io.BytesIO()
+    tipos, blocos = blocos_excel(df_export, BLOCO_EXCEL)
+    cabecalho = [str(c) for c in df_export.columns]
+
+    if motor == 'openpyxl':
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Border, Font, Side
+
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('Faturamento')
+        borda = Side(style='thin')
+        celulas = []
+        for titulo in cabecalho:
+            celula = WriteOnlyCell(worksheet, value=titulo)
+            celula.font = Font(bold=True)
+            celula.border = Border(left=borda, right=borda, top=borda, bottom=borda)
+            celulas.append(celula)
+        worksheet.append(celulas)
+        datas = [i for i, tipo in enumerate(tipos) if tipo == 'data']
+        for bloco in blocos:
+            for registro in bloco:
+                if datas:
+                    registro = list(registro)
+                    for i in datas:
+                        if registro[i] is not None:
+                            celula = WriteOnlyCell(worksheet, value=registro[i])
+                            celula.number_format = 'dd/mm/yyyy'
+                            registro[i] = celula
+                worksheet.append(registro)
+        workbook.save(output)
+        return output.getvalue()
+
+    # xlsxwriter em modo de memória constante grava linha a linha em arquivo temporário (o
+    # to_excel do pandas grava por coluna, o que não funciona nesse modo). 'in_memory' não é
+    # usado: ele desliga o constant_memory
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Faturamento')
+    formato_cabecalho = workbook.add_format({'bold': True, 'border': 1})
+    formato_data = workbook.add_format({'num_format': 'dd/mm/yyyy'})
+    worksheet.write_row(0, 0, cabecalho, formato_cabecalho)
+
+    escritores = [
+        (coluna, worksheet.write_string if tipo == 'texto' else worksheet.write_number, formato_data if tipo == 'data' else None)
+        for coluna, tipo in enumerate(tipos)
+    ]
+    linha = 1
+    for bloco in blocos:
+        for registro in bloco:
+            for coluna, escrever, formato in escritores:
+                valor = registro[coluna]
+                if valor is not None:
+                    escrever(linha, coluna, valor, formato)
+            linha += 1
+    workbook.close()
+    return output.getvalue()
+
+def formatar_tabela_pdf(df_pdf):
+    # Formata todas as células de uma vez, coluna a coluna, antes do desenho:
+    # datas em DD/MM/YYYY, números inteiros sem ".0", caracteres fora do latin-1 removidos
+    # (fontes padrão do PDF) e texto limitado a 25 caracteres
+    colunas = {}
+    for col in df_pdf.columns:
+        serie = df_pdf[col]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            texto = formatar_data(serie)
+        elif pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            numeros = serie.astype('float64')
+            inteiros = numeros.notna() & (numeros % 1 == 0)
+            texto = numeros.astype(str).mask(inteiros, numeros[inteiros].astype('int64').astype(str))
+        else:
+            texto = serie.astype(str)
+        texto = texto.where(serie.notna(), '')
+        texto = texto.str.encode('latin-1', 'ignore').str.decode('latin-1').str[:25]
+        colunas[col] = texto.tolist()
+    return colunas
+
+def gerar_pdf_profissional(df_input, buffer=None):
+    from fpdf import FPDF
+    from fpdf.enums import XPos, YPos
+
+    # 1. Definir o mapeamento de nomes (De: Nome no código -> Para: Nome no PDF)
+    mapeamento_colunas = {
+        "Restaurante": "Restaurante",
+        "Cliente": "Cliente",
+        "Inicio_Medição": "Inicio Medição",
+        "Fim_Medição": "Fim Medição",
+        "Período_Medição": "Período Medição",
+        "Prazo": "Prazo de Vencimento",
+        "Dia": "Dia de Vencimento"
+    }
+
+    # Filtrar apenas as colunas que existem (todas as linhas: a tabela continua nas páginas seguintes)
+    cols_originais = [c for c in mapeamento_colunas.keys() if c in df_input.columns]
+    celulas = formatar_tabela_pdf(df_input[cols_originais])
+    total_linhas = len(df_input)
+
+    # Definir larguras específicas para caber os nomes maiores
+    # Total largura A4 Paisagem útil aprox 280mm
+    larguras = {
+        "Restaurante": 35,
+        "Cliente": 60,
+        "Inicio_Medição": 30,
+        "Fim_Medição": 30,
+        "Período_Medição": 45,
+        "Prazo": 40,
+        "Dia": 40
+    }
+    larguras_cols = [larguras.get(col, 30) for col in cols_originais]
+
+    pdf = FPDF(orientation='L', unit='mm', format='A4')
+    pdf.set_auto_page_break(False)
+    pdf.add_page()
+    limite_pagina = pdf.h - 15
+
+    # --- CABEÇALHO DO DOCUMENTO ---
+    pdf.set_fill_color(44, 62, 80)
+    pdf.rect(0, 0, 297, 30, 'F')
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font("Helvetica", 'B', 16)
+    pdf.cell(0, 10, "RELATÓRIO DE FATURAMENTO", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.set_font("Helvetica", size=10)
+    pdf.cell(0, 10, f"Gerado em: {datetime.date.today().strftime('%d/%m/%Y')}  |  Registros: {total_linhas}",
+             new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.ln(10)
+
+    # --- CABEÇALHO DA TABELA (repetido a cada página) ---
+    def desenhar_cabecalho_tabela():
+        pdf.set_font("Helvetica", 'B', 8)
+        pdf.set_fill_color(52, 152, 219)
+        pdf.set_text_color(255, 255, 255)
+        for col, largura in zip(cols_originais, larguras_cols):
+            pdf.cell(largura, 10, mapeamento_colunas[col], border=1, align='C', fill=True)
+        pdf.ln()
+        pdf.set_font("Helvetica", size=8)
+        pdf.set_text_color(0, 0, 0)
+
+    desenhar_cabecalho_tabela()
+
+    # --- DADOS (ZEBRADOS) ---
+    # Cada linha é um retângulo preenchido + textos posicionados diretamente (bem mais leve que
+    # pdf.cell por célula); as divisórias das colunas são traçadas uma vez por página
+    altura_linha = 8
+    x_inicio = pdf.l_margin
+    posicoes_x = list(itertools.accumulate([x_inicio] + larguras_cols))
+    largura_total = posicoes_x[-1] - x_inicio
+    larguras_texto = {}
+    for col in cols_originais:
+        for texto in set(celulas[col]):
+            if texto not in larguras_texto:
+                larguras_texto[texto] = pdf.get_string_width(texto)
+    ajuste_base = altura_linha / 2 + 0.3 * pdf.font_size
+
+    def fechar_pagina(topo, base):
+        for x in posicoes_x[1:-1]:
+            pdf.line(x, topo, x, base)
+
+    topo_tabela = pdf.get_y()
+    y = topo_tabela
+    for i, linha in enumerate(zip(*(celulas[col] for col in cols_originais))):
+        if y + altura_linha > limite_pagina:
+            fechar_pagina(topo_tabela, y)
+            pdf.add_page()
+            desenhar_cabecalho_tabela()
+            topo_tabela = y = pdf.get_y()
+        if i % 2 == 0:
+            pdf.set_fill_color(245, 245, 245)
+        else:
+            pdf.set_fill_color(255, 255, 255)
+        pdf.rect(x_inicio, y, largura_total, altura_linha, 'DF')
+        base_texto = y + ajuste_base
+        for texto, x, largura in zip(linha, posicoes_x, larguras_cols):
+            if texto:
+                pdf.text(x + (largura - larguras_texto[texto]) / 2, base_texto, texto)
+        y += altura_linha
+    fechar_pagina(topo_tabela, y)
+
+    # Com buffer (arquivo ou stream aberto), o fpdf grava direto nele e o próprio buffer é
+    # devolvido, sem outra cópia do documento em memória; sem buffer, devolve os bytes
+    if buffer is not None:
+        pdf.output(buffer)
+        return buffer
+    return bytes(pdf.output())
+
+# Relatórios em lote: um arquivo por grupo (ex.: um PDF por Cliente), gerados em paralelo
+# em processos separados, já que o desenho do PDF usa só um núcleo
+GERADORES_RELATORIO = {'pdf': gerar_pdf_profissional, 'xlsx': gerar_excel}
+
+def nome_arquivo(texto):
+    return re.sub(r'[^\w\-. ]', '_', str(texto)).strip(' .') or 'sem_nome'
+
+def gerar_relatorios_grupo(nome, df_grupo, formatos, motor_excel=None):
+    # Executada nos processos do pool: devolve [(nome do arquivo, bytes)] de um grupo
+    base = nome_arquivo(nome)
+    arquivos = []
+    for formato in formatos:
+        opcoes = {'motor': motor_excel} if formato == 'xlsx' else {}
+        arquivos.append((f"{base}.{formato}", GERADORES_RELATORIO[formato](df_grupo, **opcoes)))
+    return arquivos
+
+class GeradorLote:
+    # Agrupa o DataFrame uma vez e distribui os grupos em um ProcessPoolExecutor; os arquivos
+    # entram no zip à medida que ficam prontos. Progresso (concluidos/total) pode ser lido de
+    # outra thread e cancelar() descarta os grupos que ainda não começaram.
+    def __init__(self, df, coluna, formatos=('pdf',), max_workers=None, motor_excel=None):
+        self.df = df
+        self.coluna = coluna
+        self.formatos = tuple(formatos)
+        self.max_workers = max_workers
+        self.motor_excel = motor_excel
+        self.total = 0
+        self.concluidos = 0
+        self.erro = None
+        self.resultado = None
+        self._cancelado = threading.Event()
+        self._fim = threading.Event()
+
+    @property
+    def cancelado(self):
+        return self._cancelado.is_set()
+
+    @property
+    def finalizado(self):
+        return self._fim.is_set()
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    def executar(self):
+        try:
+            with execucao(f"relatórios em lote ({self.coluna})"), etapa('geração em lote', len(self.df)):
+                self.resultado = self._gerar()
+        except Exception as e:
+            self.erro = e
+        finally:
+            self._fim.set()
+        return self.resultado
+
+    def _gerar(self):
+        grupos = self.df.groupby(self.coluna, observed=True, sort=True).indices
+        self.total = len(grupos)
+        fila = iter(grupos.items())
+        buffer = io.BytesIO()
+        usados = collections.Counter()
+        # 'spawn': o painel roda em um servidor com várias threads, e um fork copiaria locks
+        # presos por elas. Só max_workers x 2 grupos ficam recortados e em trânsito por vez.
+        # O pool é encerrado fora de um 'with' para que cancelar (ou um erro) não espere os
+        # grupos que já estão rodando
+        max_workers = self.max_workers or os.cpu_count() or 1
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        encerrado = False
+        pendentes = set()
+
+        def enviar():
+            for nome, posicoes in itertools.islice(fila, max_workers * 2 - len(pendentes)):
+                pendentes.add(pool.submit(gerar_relatorios_grupo, nome, self.df.take(posicoes), self.formatos, self.motor_excel))
+
+        try:
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip:
+                enviar()
+                while pendentes:
+                    prontas, pendentes = concurrent.futures.wait(
+                        pendentes, timeout=0.5, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    if self._cancelado.is_set():
+                        return None
+                    for tarefa in prontas:
+                        for nome, conteudo in tarefa.result():
+                            usados[nome] += 1
+                            if usados[nome] > 1:
+                                raiz, extensao = os.path.splitext(nome)
+                                nome = f"{raiz} ({usados[nome]}){extensao}"
+                            arquivo_zip.writestr(nome, conteudo)
+                        self.concluidos += 1
+                    enviar()
+            encerrado = True
+        finally:
+            pool.shutdown(wait=encerrado, cancel_futures=True)
+        return buffer.getvalue()
+
+# ----------------------------------------------------
+# 4. AGREGAÇÃO (KPIs e séries dos gráficos)
+# ----------------------------------------------------
+class CuboFaturamento:
+    # Agregações prévias (soma e contagens) só pelas colunas que cada gráfico agrupa: uma tabela
+    # marginal por gráfico, montada uma vez por carga de dados. Um filtro ativo acrescenta a sua
+    # coluna (datas por dia) às tabelas; a tabela de cada conjunto de colunas filtradas é montada
+    # na primeira vez em que ele aparece e reaproveitada pelos demais valores escolhidos.
+    # As tabelas guardam códigos inteiros, como o IndiceFiltros: um estado de filtro vira uma
+    # máscara sobre os grupos e as séries saem de np.bincount, então o custo depende do número
+    # de grupos e não do número de linhas. Os resumos ficam memorizados pelo estado dos filtros.
+    GRAFICOS = {
+        'total': [],
+        'cliente': ['Cliente'],
+        'restaurante': ['Restaurante'],
+        'mes': ['Mes_Ano_Faturamento', 'Carteira'],
+    }
+    LIMITE_MEMORIA = 64
+    LIMITE_TABELAS = 32
+
+    def __init__(self, df):
+        self.df = df
+        self._tabelas = collections.OrderedDict()
+        self._resumos = collections.OrderedDict()
+        self._colunas = {}
+        self._lock = threading.Lock()
+        for nome in self.GRAFICOS:
+            self.tabela(nome, ())
+
+    def tabela(self, nome, filtros):
+        chave = (nome, filtros)
+        with self._lock:
+            if chave in self._tabelas:
+                self._tabelas.move_to_end(chave)
+                return self._tabelas[chave]
+
+        dimensoes = [c for c in dict.fromkeys(self.GRAFICOS[nome] + list(filtros)) if c in self.df.columns]
+        tabela = self.agrupar(dimensoes)
+
+        with self._lock:
+            self._tabelas[chave] = tabela
+            if len(self._tabelas) > self.LIMITE_TABELAS:
+                self._tabelas.popitem(last=False)
+        return tabela
+
+    def codigos_coluna(self, col):
+        # Códigos por linha de cada coluna, calculados uma vez por cubo e reaproveitados por todas
+        # as tabelas que a usam: categorias (ou dias, para datas) e códigos a partir de 1 (0 = vazio)
+        with self._lock:
+            if col in self._colunas:
+                return self._colunas[col]
+        serie = self.df[col]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            # NaT vira o menor int64 e fica fora de qualquer período
+            codigos, categorias = pd.factorize(serie.to_numpy().astype('datetime64[D]').astype('int64'))
+        elif isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos, categorias = serie.cat.codes.to_numpy(), serie.cat.categories
+        else:
+            codigos, categorias = pd.factorize(serie)
+        resultado = (codigos.astype('int64') + 1, pd.Index(categorias))
+        with self._lock:
+            self._colunas[col] = resultado
+        return resultado
+
+    def agrupar(self, dimensoes):
+        # Grupos por códigos inteiros: os códigos de cada coluna são combinados em um id de grupo;
+        # somas e contagens saem de np.bincount
+        df = self.df
+        tabela = {'codigos': {}, 'categorias': {}, 'rotulos': {}, 'dias': {}}
+        grupo = np.zeros(len(df), dtype='int64')
+        possiveis = 1
+        codigos_linhas = []
+        for col in dimensoes:
+            codigos, categorias = self.codigos_coluna(col)
+            if possiveis * (len(categorias) + 1) >= 2 ** 62:
+                grupo, unicos = pd.factorize(grupo)
+                possiveis = len(unicos)
+            grupo = grupo * (len(categorias) + 1) + codigos
+            possiveis *= len(categorias) + 1
+            codigos_linhas.append(codigos)
+            tabela['categorias'][col] = categorias
+
+        if possiveis <= max(4 * len(grupo), 1 << 16):
+            # Espaço de combinações pequeno: compacta os ids pelos presentes, sem hash
+            presentes = np.flatnonzero(np.bincount(grupo, minlength=possiveis))
+            novos = np.zeros(possiveis, dtype='int64')
+            novos[presentes] = np.arange(len(presentes))
+            grupo, total_grupos = novos[grupo], len(presentes)
+        else:
+            grupo, unicos = pd.factorize(grupo)
+            total_grupos = len(unicos)
+        total_grupos = total_grupos if dimensoes else 1
+        primeira_linha = np.zeros(total_grupos, dtype='int64')
+        primeira_linha[grupo[::-1]] = np.arange(len(grupo) - 1, -1, -1)
+        for col, codigos in zip(dimensoes, codigos_linhas):
+            codigos_grupo = codigos[primeira_linha] - 1
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                tabela['dias'][col] = tabela['categorias'].pop(col).to_numpy()[codigos_grupo]
+            else:
+                tabela['codigos'][col] = codigos_grupo
+                tabela['rotulos'][col] = tabela['categorias'][col].astype(str).to_numpy(dtype=object)
+
+        valor = df['Valor_Faturamento'].to_numpy(dtype=float)
+        tabela['valor'] = np.bincount(grupo, weights=valor, minlength=total_grupos)
+        tabela['medicoes'] = np.bincount(grupo, weights=valor > 0, minlength=total_grupos).astype('int64')
+        if 'Cliente' in tabela['rotulos']:
+            # Total de clientes conta o nome antes do '-' (a mesma empresa em várias unidades)
+            nomes = pd.Series(tabela['rotulos']['Cliente']).str.split('-').str[0].str.strip()
+            tabela['empresas'] = pd.factorize(nomes)[0]
+        return tabela
+
+    @staticmethod
+    def mascara(tabela, selecoes, periodos):
+        mascara = np.ones(len(tabela['valor']), dtype=bool)
+        for col, escolhidos in selecoes.items():
+            if col not in tabela['codigos']:
+                continue
+            permitidos = np.zeros(len(tabela['categorias'][col]) + 1, dtype=bool)
+            posicoes = tabela['categorias'][col].get_indexer(escolhidos)
+            permitidos[posicoes[posicoes >= 0]] = True
+            mascara &= permitidos[tabela['codigos'][col]]
+        for col, (inicio, fim) in periodos.items():
+            if col not in tabela['dias']:
+                continue
+            dias = tabela['dias'][col]
+            mascara &= (dias >= np.datetime64(inicio, 'D').astype('int64')) & (dias <= np.datetime64(fim, 'D').astype('int64'))
+        return mascara
+
+    def resumo(self, selecoes, periodos):
+        chave = (
+            tuple(sorted((col, tuple(sorted(map(str, v)))) for col, v in selecoes.items() if v)),
+            tuple(sorted((col, tuple(p)) for col, p in periodos.items())),
+        )
+        with self._lock:
+            if chave in self._resumos:
+                self._resumos.move_to_end(chave)
+                return self._resumos[chave]
+
+        selecoes = {col: v for col, v in selecoes.items() if v and col in self.df.columns}
+        periodos = {col: p for col, p in periodos.items() if col in self.df.columns}
+        filtros = tuple(sorted(selecoes)) + tuple(sorted(periodos))
+        recortes = {}
+        for nome in self.GRAFICOS:
+            tabela = self.tabela(nome, filtros)
+            recortes[nome] = (tabela, self.mascara(tabela, selecoes, periodos))
+        resultado = self.calcular_resumo(recortes)
+
+        with self._lock:
+            self._resumos[chave] = resultado
+            if len(self._resumos) > self.LIMITE_MEMORIA:
+                self._resumos.popitem(last=False)
+        return resultado
+
+    @staticmethod
+    def somar(tabela, mascara, colunas, por_valor=False):
+        # Soma por combinação das colunas, só as combinações presentes, em ordem de código (ou
+        # crescente de valor); grupos sem valor na coluna (código -1) ficam de fora, como no groupby
+        for c in colunas:
+            mascara = mascara & (tabela['codigos'][c] >= 0)
+        tamanhos = [len(tabela['rotulos'][c]) for c in colunas]
+        codigos = np.ravel_multi_index([tabela['codigos'][c][mascara] for c in colunas], tamanhos)
+        total = int(np.prod(tamanhos))
+        soma = np.bincount(codigos, weights=tabela['valor'][mascara], minlength=total)
+        presentes = np.flatnonzero(np.bincount(codigos, minlength=total))
+        valores = soma[presentes]
+        if por_valor:
+            ordem = np.argsort(valores, kind='stable')
+            presentes, valores = presentes[ordem], valores[ordem]
+        indices = np.unravel_index(presentes, tamanhos)
+        return pd.DataFrame({
+            **{c: tabela['rotulos'][c][i] for c, i in zip(colunas, indices)},
+            'Valor_Faturamento': valores,
+        })
+
+    @classmethod
+    def calcular_resumo(cls, recortes):
+        total, mascara = recortes['total']
+        resumo = {
+            'faturamento_total': float(total['valor'][mascara].sum()),
+            'contagem_medicoes': int(total['medicoes'][mascara].sum()),
+        }
+        tabela, mascara = recortes['cliente']
+        if 'Cliente' in tabela['codigos']:
+            clientes = tabela['codigos']['Cliente'][mascara]
+            resumo['total_clientes'] = len(np.unique(tabela['empresas'][clientes[clientes >= 0]]))
+            resumo['por_cliente'] = cls.somar(tabela, mascara, ['Cliente'], por_valor=True)
+        tabela, mascara = recortes['restaurante']
+        if 'Restaurante' in tabela['codigos']:
+            resumo['por_restaurante'] = cls.somar(tabela, mascara, ['Restaurante'], por_valor=True)
+        tabela, mascara = recortes['mes']
+        if 'Mes_Ano_Faturamento' in tabela['codigos']:
+            # As categorias do mês já estão em ordem cronológica (compactar_tipos), então a
+            # ordem dos códigos é a ordem das séries
+            meses = tabela['categorias']['Mes_Ano_Faturamento']
+            if 'Sem Data' in meses:
+                mascara = mascara & (tabela['codigos']['Mes_Ano_Faturamento'] != meses.get_loc('Sem Data'))
+            resumo['por_mes'] = cls.somar(tabela, mascara, ['Mes_Ano_Faturamento'])
+            if 'Carteira' in tabela['codigos']:
+                resumo['por_mes_carteira'] = cls.somar(tabela, mascara, ['Mes_Ano_Faturamento', 'Carteira'])
+        return resumo
+
+# ----------------------------------------------------
+# 5. TABELA (ordem das colunas, busca e ordenação)
+# ----------------------------------------------------
+def buscar_texto(df, termo):
+    # Busca sem diferenciar maiúsculas nas colunas de texto; nas categóricas o teste é feito
+    # uma vez por categoria e propagado para as linhas pelos códigos
+    termo = termo.strip().lower()
+    if not termo or df.empty:
+        return df
+    mascara = np.zeros(len(df), dtype=bool)
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            encontradas = serie.cat.categories.astype(str).str.lower().str.contains(termo, regex=False)
+            codigos = serie.cat.codes.to_numpy()
+            mascara |= np.append(np.asarray(encontradas, dtype=bool), False)[codigos]
+        elif pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie):
+            mascara |= serie.astype('string').str.contains(termo, case=False, regex=False, na=False).to_numpy(dtype=bool)
+    return df[mascara]
+
+def ordenar_posicoes(df, coluna, crescente):
+    # Posições das linhas na ordem pedida (vazios sempre no fim)
+    return (
+        df[coluna].reset_index(drop=True)
+        .sort_values(ascending=crescente, na_position='last', kind='stable')
+        .index.to_numpy()
+    )
+
+def ordenar_colunas(df, col_venc=None):
+    # Ordem usada na tabela e nas exportações: Tempo e Fat x Venc junto da Data_Faturamento
+    # e cada validação logo após a data que ela confere
+    col_venc = col_venc or coluna_vencimento(df)
+    cols = list(df.columns)
+    for c in ['Tempo', 'Fat x Venc', 'Validação', 'Validação do Vencimento']:
+        if c in cols: cols.remove(c)
+
+    if 'Data_Faturamento' in cols:
+        idx_fat = cols.index('Data_Faturamento')
+        if 'Tempo' in df.columns:
+            cols.insert(idx_fat, 'Tempo')
+            idx_fat += 1
+        if 'Fat x Venc' in df.columns:
+            cols.insert(idx_fat + 1, 'Fat x Venc')
+
+    if 'Fim_Medição' in cols:
+        idx_fim = cols.index('Fim_Medição')
+        if 'Validação' in df.columns:
+            cols.insert(idx_fim + 1, 'Validação')
+
+    if col_venc in cols:
+        idx_venc = cols.index(col_venc)
+        if 'Validação do Vencimento' in df.columns:
+            cols.insert(idx_venc + 1, 'Validação do Vencimento')
+
+    return df[cols]
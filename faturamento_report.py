@@ -0,0 +1,133 @@
+"""Gera o relatório de faturamento (Excel ou PDF) sem abrir o painel.
+
+Usa as mesmas regras de carga, classificação e filtros do dashboard.py, para rodar em
+tarefas agendadas (cron). Exemplos:
+
+    python faturamento_report.py --source dados.csv --out relatorio.xlsx
+    python faturamento_report.py --source dados.csv --filters Cliente="A - 1" Carteira=Boleto \\
+        --periodos Data_Faturamento=2024-01-01:2024-12-31 --out relatorio.pdf
+    python faturamento_report.py --source dados.csv --por Cliente --formatos pdf xlsx --out clientes.zip
+    python faturamento_report.py --fontes "Unidade A=a.csv;Unidade B=gsheet:<id>" --out consolidado.xlsx
+    python faturamento_report.py --source dados.csv --motor-excel openpyxl --out relatorio.xlsx
+"""
+import argparse
+import datetime
+import os
+import sys
+import threading
+import time
+
+from faturamento import (
+    FONTE_PLANILHA, MOTOR_EXCEL, MOTORES_EXCEL, ler_fontes, carregar_dados, filtrar, ordenar_colunas, coluna_vencimento,
+    gerar_excel, gerar_pdf_profissional, GeradorLote, GERADORES_RELATORIO,
+)
+from formatacao import formatar_moeda
+from desempenho import medido, etapa
+
+GERADORES = {'.xlsx': gerar_excel, '.pdf': gerar_pdf_profissional}
+
+
+def ler_pares(itens, opcao):
+    pares = {}
+    for item in itens or []:
+        coluna, separador, valor = item.partition('=')
+        if not separador or not coluna.strip():
+            raise SystemExit(f"{opcao}: use COLUNA=VALOR (recebido: {item!r})")
+        pares[coluna.strip()] = valor
+    return pares
+
+
+def ler_periodo(texto, opcao):
+    inicio, separador, fim = texto.partition(':')
+    try:
+        return (datetime.date.fromisoformat(inicio.strip()),
+                datetime.date.fromisoformat((fim if separador else inicio).strip()))
+    except ValueError:
+        raise SystemExit(f"{opcao}: período deve ser AAAA-MM-DD:AAAA-MM-DD (recebido: {texto!r})")
+
+
+def gerar_em_lote(df_export, coluna, formatos, saida, max_workers, motor_excel=None):
+    # Mostra o progresso no stderr; Ctrl+C cancela os grupos que ainda não começaram
+    lote = GeradorLote(df_export, coluna, formatos, max_workers=max_workers, motor_excel=motor_excel)
+    thread = threading.Thread(target=lote.executar, name='relatorios-lote')
+    thread.start()
+    try:
+        while not lote.finalizado:
+            print(f"\r{coluna}: {lote.concluidos}/{lote.total} grupo(s)", end='', file=sys.stderr, flush=True)
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        lote.cancelar()
+    thread.join()
+    print(f"\r{coluna}: {lote.concluidos}/{lote.total} grupo(s)", file=sys.stderr)
+
+    if lote.erro is not None:
+        raise SystemExit(f"erro ao gerar os relatórios: {lote.erro}")
+    if lote.cancelado:
+        raise SystemExit("cancelado")
+    with open(saida, 'wb') as arquivo:
+        arquivo.write(lote.resultado)
+    return lote.total
+
+
+@medido('relatório (linha de comando)')
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='faturamento-report', description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=FONTE_PLANILHA,
+                        help='URL/"gsheet:<id>", .csv, .parquet ou "banco.db#tabela" (padrão: FATURAMENTO_FONTE ou a planilha oficial)')
+    parser.add_argument('--fontes', metavar='ROTULO=FONTE;...',
+                        help='várias planilhas consolidadas (substitui --source), ex.: "Unidade A=a.csv;Unidade B=gsheet:<id>"')
+    parser.add_argument('--filters', nargs='*', metavar='COLUNA=V1,V2',
+                        help='filtros de categoria, ex.: Cliente="A - 1" Restaurante=R1,R2')
+    parser.add_argument('--periodos', nargs='*', metavar='COLUNA=INICIO:FIM',
+                        help='filtros de data (AAAA-MM-DD), ex.: Data_Faturamento=2024-01-01:2024-03-31')
+    parser.add_argument('--por', metavar='COLUNA',
+                        help='gera um relatório por valor da coluna (ex.: Cliente, Restaurante) em um .zip')
+    parser.add_argument('--formatos', nargs='+', choices=sorted(GERADORES_RELATORIO), default=['pdf'],
+                        help='formatos gerados por grupo com --por (padrão: pdf)')
+    parser.add_argument('--processos', type=int, default=None,
+                        help='processos em paralelo com --por (padrão: um por núcleo)')
+    parser.add_argument('--motor-excel', choices=MOTORES_EXCEL, default=MOTOR_EXCEL,
+                        help=f'biblioteca usada para gravar o .xlsx (padrão: FATURAMENTO_MOTOR_EXCEL ou {MOTOR_EXCEL})')
+    parser.add_argument('--out', required=True, help='arquivo de saída (.xlsx ou .pdf; .zip com --por)')
+    args = parser.parse_args(argv)
+
+    extensao = os.path.splitext(args.out)[1].lower()
+    if args.por and extensao != '.zip':
+        parser.error("com --por, --out deve terminar em .zip")
+    if not args.por and extensao not in GERADORES:
+        parser.error(f"--out deve terminar em {' ou '.join(GERADORES)}")
+
+    selecoes = {col: [v.strip() for v in valores.split(',') if v.strip()]
+                for col, valores in ler_pares(args.filters, '--filters').items()}
+    periodos = {col: ler_periodo(texto, '--periodos')
+                for col, texto in ler_pares(args.periodos, '--periodos').items()}
+
+    try:
+        fonte = ler_fontes(args.fontes) if args.fontes else args.source
+    except ValueError as e:
+        parser.error(f"--fontes: {e}")
+    df = carregar_dados(fonte)
+    desconhecidas = [c for c in [*selecoes, *periodos, *([args.por] if args.por else [])] if c not in df.columns]
+    if desconhecidas:
+        parser.error(f"coluna(s) inexistente(s): {', '.join(desconhecidas)}")
+
+    with etapa('filtros') as medicao:
+        df_export = ordenar_colunas(filtrar(df, selecoes, periodos), coluna_vencimento(df))
+        medicao['linhas'] = len(df_export)
+    if args.por:
+        grupos = gerar_em_lote(df_export, args.por, args.formatos, args.out, args.processos, args.motor_excel)
+        print(f"{args.out}: {grupos} grupo(s), {len(df_export)} linha(s), {formatar_moeda(df_export['Valor_Faturamento'].sum())}")
+        return 0
+
+    with etapa(f"geração {extensao[1:].upper()}", len(df_export)), open(args.out, 'wb') as arquivo:
+        if extensao == '.pdf':
+            gerar_pdf_profissional(df_export, buffer=arquivo)
+        else:
+            arquivo.write(gerar_excel(df_export, motor=args.motor_excel))
+
+    print(f"{args.out}: {len(df_export)} linha(s), {formatar_moeda(df_export['Valor_Faturamento'].sum())}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------
+# FORMATAÇÃO PADRÃO BRASILEIRO (por coluna ou valor único)
+# ----------------------------------------------------
+# Usada nos KPIs, nos rótulos dos gráficos e nas exportações, para que todos mostrem
+# "R$ 1.234,56", "DD/MM/YYYY" e "N dias" da mesma forma. Valores vazios ou não numéricos
+# viram texto vazio.
+
+def _como_serie(valores):
+    if isinstance(valores, pd.Series):
+        return valores, False
+    if np.ndim(valores) == 0:
+        return pd.Series([valores]), True
+    return pd.Series(valores), False
+
+def _numero(valor):
+    # Valor único como float finito (None para vazio, texto não numérico, inf)
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return numero if math.isfinite(numero) else None
+
+def _moeda(numero):
+    # "1_234.56" -> "1.234,56": o separador de milhar "_" evita a troca em três passos
+    return f"R$ {numero:_.2f}".replace('.', ',').replace('_', '.')
+
+def formatar_moeda(valores):
+    # Um valor (KPIs) é formatado direto; colunas passam pelo mesmo formatador valor a valor,
+    # o que custa menos que montar o texto com operações de array para os tamanhos usados aqui
+    if not isinstance(valores, pd.Series) and np.ndim(valores) == 0:
+        numero = _numero(valores)
+        return '' if numero is None else _moeda(numero)
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores)
+    numeros = pd.to_numeric(serie, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    textos = list(map(_moeda, numeros.tolist()))
+    for posicao in np.flatnonzero(~np.isfinite(numeros)):
+        textos[posicao] = ''
+    return pd.Series(textos, index=serie.index, dtype=object)
+
+def formatar_data(valores):
+    serie, escalar = _como_serie(valores)
+    texto = pd.to_datetime(serie, errors='coerce').dt.strftime('%d/%m/%Y').fillna('')
+    return texto.iloc[0] if escalar else texto
+
+def formatar_dias(valores):
+    # "1 dia", "N dias"; um valor (ex.: idade dos dados) é formatado direto
+    if not isinstance(valores, pd.Series) and np.ndim(valores) == 0:
+        numero = _numero(valores)
+        if numero is None:
+            return ''
+        dias = round(numero)
+        return f"{dias} dia" if abs(dias) == 1 else f"{dias} dias"
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores)
+    numeros = pd.to_numeric(serie, errors='coerce').astype('float64').round()
+    numeros = numeros.where(np.isfinite(numeros))
+    sufixo = np.where(numeros.abs() == 1, ' dia', ' dias')
+    return (numeros.astype('Int64').astype(str) + sufixo).mask(numeros.isna(), '')
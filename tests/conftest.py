@@ -0,0 +1,18 @@
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+
+import pytest
+
+from faturamento import processar_dados, compactar_tipos
+from gerar_dados import gerar_planilha
+
+
+@pytest.fixture(scope='module')
+def df(request):
+    # Planilha sintética já processada e compactada, como o painel a carrega; 300 linhas por
+    # padrão, ou outro tamanho com @pytest.mark.parametrize('df', [linhas], indirect=True)
+    return compactar_tipos(processar_dados(gerar_planilha(getattr(request, 'param', 300))))
@@ -0,0 +1,57 @@
+# Suíte de benchmarks: roda de ponta a ponta com uma planilha mínima e as regras de comparação
+# com a baseline (tolerância, diferença mínima e casos paralelos)
+import json
+import os
+import subprocess
+import sys
+
+import suite
+
+SUITE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'suite.py')
+
+
+def resultado(caso, segundos, paralelo=False, tamanho=300):
+    return {'tamanho': tamanho, 'caso': caso, 'segundos': segundos, 'linhas_por_s': None, 'pico_mb': None, 'paralelo': paralelo}
+
+
+def test_suite_com_planilha_minima(tmp_path):
+    # Baseline forjada: casos sequenciais "rápidos demais" (regressão), entre eles a carga de uma
+    # fonte, e um paralelo gravado com uma CPU (não comparável)
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps({
+        'data': 'teste', 'ambiente': {'cpus': 1},
+        'resultados': [resultado('índice de filtros', 1e-9), resultado('carregar_dados (sem cache)', 1e-9),
+                       resultado('carregar_dados (4 fontes, sem cache)', 1e-9, paralelo=True)],
+    }))
+    processo = subprocess.run(
+        [sys.executable, SUITE, '--tamanhos', '300', '--repeticoes', '1', '--sem-memoria', '--limite-pdf', '100',
+         '--minimo-ms', '0', '--baseline', str(baseline)],
+        capture_output=True, text=True, timeout=600,
+    )
+    assert processo.returncode == 1, processo.stdout + processo.stderr
+    linhas = processo.stdout.splitlines()
+    for caso in ['carregar_dados (sem cache)', 'carregar_dados (4 fontes, sem cache)', 'cubo (montagem)',
+                 'gerar_excel (openpyxl)', 'gerar_pdf_profissional (100 linhas)',
+                 'relatórios em lote (PDF por Restaurante, 100 linhas)']:
+        assert any(caso in linha for linha in linhas), caso
+    assert any('índice de filtros' in linha and 'REGRESSÃO' in linha for linha in linhas)
+    assert any('carregar_dados (sem cache)' in linha and 'REGRESSÃO' in linha for linha in linhas)
+    assert any('carregar_dados (4 fontes, sem cache)' in linha and 'não comparável' in linha for linha in linhas)
+
+
+def test_diferenca_minima_e_tolerancia():
+    baseline = {'ambiente': {'cpus': 4}, 'resultados': [resultado('a', 0.001), resultado('b', 1.0), resultado('c', 1.0)]}
+    atuais = [resultado('a', 0.003), resultado('b', 1.5), resultado('c', 1.1)]
+    regressoes = suite.comparar(atuais, baseline, tolerancia=0.25, minimo_ms=10, cpus=4)
+    # 'a' triplicou, mas por 2 ms; 'c' ficou dentro da tolerância
+    assert [r['caso'] for r in regressoes] == ['b']
+
+
+def test_casos_paralelos_so_com_a_mesma_quantidade_de_cpus():
+    baseline = {'ambiente': {'cpus': 1}, 'resultados': [resultado('lote', 1.0, paralelo=True), resultado('excel', 1.0)]}
+    atuais = [resultado('lote', 5.0, paralelo=True), resultado('excel', 5.0)]
+    assert [r['caso'] for r in suite.comparar(atuais, baseline, 0.25, cpus=1)] == ['excel']
+
+    baseline['ambiente']['cpus'] = 8
+    assert [r['caso'] for r in suite.comparar(atuais, baseline, 0.25, cpus=4)] == ['excel']
+    assert [r['caso'] for r in suite.comparar(atuais, baseline, 0.25, cpus=8)] == ['lote', 'excel']
@@ -0,0 +1,119 @@
+# Cache em disco do carregar_dados com um CSV local no lugar da planilha: acerto, invalidação
+# por conteúdo e por VERSAO_PROCESSAMENTO, uma subpasta por fonte e o snapshot da partida a frio
+import os
+import time
+
+import pytest
+
+import faturamento
+from gerar_dados import gerar_planilha
+
+
+@pytest.fixture
+def processamentos(tmp_path, monkeypatch):
+    # Conta as cargas que passaram pelo pipeline (as que não vieram do cache)
+    monkeypatch.setattr(faturamento, 'PASTA_CACHE', str(tmp_path / 'cache'))
+    chamadas = []
+    original = faturamento.processar_incremental
+
+    def processar_incremental(*args, **kwargs):
+        chamadas.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(faturamento, 'processar_incremental', processar_incremental)
+    return chamadas
+
+
+def planilha(caminho, semente=0, linhas=200):
+    gerar_planilha(linhas, semente=semente).to_csv(caminho, index=False)
+    return str(caminho)
+
+
+def arquivos_cache(fonte):
+    pasta = faturamento.pasta_cache(faturamento.criar_fonte(fonte))
+    return sorted(n for n in os.listdir(pasta) if n.endswith('.parquet'))
+
+
+def test_acerto(tmp_path, processamentos):
+    fonte = planilha(tmp_path / 'prod.csv')
+    primeira = faturamento.carregar_dados(fonte)
+    segunda = faturamento.carregar_dados(fonte)
+
+    assert len(processamentos) == 1
+    assert segunda.attrs['versao_dados'] == primeira.attrs['versao_dados']
+    assert len(segunda) == len(primeira) == 200
+
+
+def test_conteudo_alterado(tmp_path, processamentos):
+    fonte = planilha(tmp_path / 'prod.csv')
+    primeira = faturamento.carregar_dados(fonte)
+    planilha(fonte, semente=1)
+    segunda = faturamento.carregar_dados(fonte)
+
+    assert len(processamentos) == 2
+    assert segunda.attrs['versao_dados'] != primeira.attrs['versao_dados']
+    assert arquivos_cache(fonte) == [f"{segunda.attrs['versao_dados']}.parquet"]
+
+
+def test_versao_processamento(tmp_path, processamentos, monkeypatch):
+    fonte = planilha(tmp_path / 'prod.csv')
+    primeira = faturamento.carregar_dados(fonte)
+    monkeypatch.setattr(faturamento, 'VERSAO_PROCESSAMENTO', faturamento.VERSAO_PROCESSAMENTO + 1)
+    segunda = faturamento.carregar_dados(fonte)
+
+    assert len(processamentos) == 2
+    assert segunda.attrs['versao_dados'] != primeira.attrs['versao_dados']
+    assert arquivos_cache(fonte) == [f"{segunda.attrs['versao_dados']}.parquet"]
+
+
+def test_fontes_isoladas(tmp_path, processamentos):
+    # Carregar outra fonte da mesma pasta de trabalho (ex.: o CLI com --source teste.csv)
+    # não descarta o cache da fonte do painel
+    prod = planilha(tmp_path / 'prod.csv')
+    teste = planilha(tmp_path / 'teste.csv', semente=1)
+    faturamento.carregar_dados(prod)
+    faturamento.carregar_dados(teste)
+    faturamento.carregar_dados(prod)
+
+    assert len(processamentos) == 2
+    assert len(arquivos_cache(prod)) == len(arquivos_cache(teste)) == 1
+    assert faturamento.pasta_cache(faturamento.criar_fonte(prod)) != faturamento.pasta_cache(faturamento.criar_fonte(teste))
+
+
+def partida_a_frio(fonte, monkeypatch):
+    # Sobe o AtualizadorPlanilha e espera a primeira tentativa de download terminar
+    monkeypatch.setattr(faturamento, 'ESPERA_INICIAL_TENTATIVA', 0)
+    atualizador = faturamento.AtualizadorPlanilha(fonte)
+    servido = atualizador.df
+    limite = time.monotonic() + 30
+    while atualizador.atualizacoes == 0 and time.monotonic() < limite:
+        time.sleep(0.05)
+    atualizador.parar()
+    return servido, atualizador.obter()
+
+
+def test_snapshot_de_outra_fonte_nao_e_servido(tmp_path, processamentos, monkeypatch):
+    # prod.csv carregado, depois teste.csv (5 linhas) da mesma pasta; com prod.csv fora do ar
+    # o painel continua servindo o último dado válido de prod.csv, nunca a planilha de teste
+    prod = planilha(tmp_path / 'prod.csv')
+    faturamento.carregar_dados(prod)
+    faturamento.carregar_dados(planilha(tmp_path / 'teste.csv', semente=1, linhas=5))
+    os.remove(prod)
+
+    servido, (df, _, erro) = partida_a_frio(prod, monkeypatch)
+
+    assert len(servido) == len(df) == 200
+    assert df.attrs['fonte'] == faturamento.criar_fonte(prod).identidade()
+    assert erro is not None
+
+
+def test_snapshot_de_outra_versao_nao_e_servido(tmp_path, processamentos, monkeypatch):
+    prod = planilha(tmp_path / 'prod.csv')
+    faturamento.carregar_dados(prod)
+    os.remove(prod)
+    monkeypatch.setattr(faturamento, 'VERSAO_PROCESSAMENTO', faturamento.VERSAO_PROCESSAMENTO + 1)
+
+    servido, (df, _, erro) = partida_a_frio(prod, monkeypatch)
+
+    assert servido is None and df is None
+    assert erro is not None
@@ -0,0 +1,94 @@
+# Paridade dos resumos do CuboFaturamento (tabelas marginais recortadas) com groupby direto
+# sobre as linhas filtradas, para vários estados de filtro
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from faturamento import processar_dados, compactar_tipos, filtrar, CuboFaturamento
+from gerar_dados import gerar_planilha
+
+
+@pytest.fixture(scope='module')
+def df():
+    bruto = gerar_planilha(8_000, semente=3)
+    bruto['Origem'] = np.random.default_rng(3).choice(['Unidade A', 'Unidade B'], len(bruto))
+    return compactar_tipos(processar_dados(bruto))
+
+
+def direto(df, selecoes, periodos):
+    filtrado = filtrar(df, selecoes, periodos)
+    meses = filtrado[filtrado['Mes_Ano_Faturamento'] != 'Sem Data'].assign(
+        Mes_Ano_Faturamento=lambda d: d['Mes_Ano_Faturamento'].astype(str), Carteira=lambda d: d['Carteira'].astype(str))
+    clientes = pd.Series(filtrado['Cliente'].astype(str).unique())
+    return {
+        'faturamento_total': filtrado['Valor_Faturamento'].sum(),
+        'contagem_medicoes': int((filtrado['Valor_Faturamento'] > 0).sum()),
+        'total_clientes': clientes.str.split('-').str[0].str.strip().nunique(),
+        'por_cliente': filtrado.groupby(filtrado['Cliente'].astype(str))['Valor_Faturamento'].sum().to_dict(),
+        'por_restaurante': filtrado.groupby(filtrado['Restaurante'].astype(str))['Valor_Faturamento'].sum().to_dict(),
+        'por_mes': meses.groupby('Mes_Ano_Faturamento')['Valor_Faturamento'].sum().to_dict(),
+        'por_mes_carteira': meses.groupby(['Mes_Ano_Faturamento', 'Carteira'])['Valor_Faturamento'].sum().to_dict(),
+    }
+
+
+def como_dict(tabela, chaves):
+    return {tuple(linha[:-1]) if len(chaves) > 1 else linha[0]: linha[-1]
+            for linha in tabela[chaves + ['Valor_Faturamento']].itertuples(index=False)}
+
+
+def conferir(resumo, esperado):
+    assert resumo['faturamento_total'] == pytest.approx(esperado['faturamento_total'])
+    assert resumo['contagem_medicoes'] == esperado['contagem_medicoes']
+    assert resumo['total_clientes'] == esperado['total_clientes']
+    assert como_dict(resumo['por_cliente'], ['Cliente']) == pytest.approx(esperado['por_cliente'])
+    assert como_dict(resumo['por_restaurante'], ['Restaurante']) == pytest.approx(esperado['por_restaurante'])
+    assert como_dict(resumo['por_mes'], ['Mes_Ano_Faturamento']) == pytest.approx(esperado['por_mes'])
+    assert como_dict(resumo['por_mes_carteira'], ['Mes_Ano_Faturamento', 'Carteira']) == pytest.approx(esperado['por_mes_carteira'])
+
+    # Séries mensais em ordem cronológica e rankings em ordem crescente de valor
+    for serie in ('por_mes', 'por_mes_carteira'):
+        datas = pd.to_datetime(resumo[serie]['Mes_Ano_Faturamento'], format='%m/%Y')
+        assert datas.is_monotonic_increasing
+    assert resumo['por_cliente']['Valor_Faturamento'].is_monotonic_increasing
+    assert resumo['por_restaurante']['Valor_Faturamento'].is_monotonic_increasing
+
+
+PERIODO = {'Data_Faturamento': (datetime.date(2023, 3, 15), datetime.date(2024, 2, 10))}
+ESTADOS = {
+    'sem filtros': ({}, {}),
+    'restaurante': ({'Restaurante': ['Restaurante 01', 'Restaurante 07']}, {}),
+    'restaurante, outros valores': ({'Restaurante': ['Restaurante 02']}, {}),
+    'cliente e carteira': ({'Cliente': ['Cliente 001 - Unidade A', 'Cliente 002 - Unidade B'], 'Carteira': ['Boleto']}, {}),
+    'status': ({'Validação': ['✅ Concluído'], 'Validação do Vencimento': ['❌ Depois do Prazo', '🚀 Antecipado']}, {}),
+    'origem e encerrada': ({'Origem': ['Unidade B'], 'Medição_Encerrada': ['OK']}, {}),
+    'lista vazia é ignorada': ({'Cliente': [], 'Validação_Cliente': ['Sim']}, {}),
+    'período': ({}, PERIODO),
+    'período e restaurante': ({'Restaurante': ['Restaurante 05']}, PERIODO),
+    'dois períodos': ({}, {**PERIODO, 'Fim_Medição': (datetime.date(2023, 1, 1), datetime.date(2023, 12, 31))}),
+    'período sem linhas': ({}, {'Data_Faturamento': (datetime.date(2030, 1, 1), datetime.date(2030, 12, 31))}),
+    'valor inexistente': ({'Restaurante': ['Restaurante 99']}, {}),
+}
+
+
+@pytest.mark.parametrize('estado', list(ESTADOS))
+def test_paridade_com_groupby_direto(df, estado):
+    selecoes, periodos = ESTADOS[estado]
+    conferir(CuboFaturamento(df).resumo(selecoes, periodos), direto(df, selecoes, periodos))
+
+
+def test_mesmo_cubo_para_todos_os_estados(df):
+    # Tabelas marginais e resumos reaproveitados entre estados não podem vazar de um para o outro
+    cubo = CuboFaturamento(df)
+    cubo.LIMITE_TABELAS = 8
+    for _ in range(2):
+        for selecoes, periodos in ESTADOS.values():
+            conferir(cubo.resumo(selecoes, periodos), direto(df, selecoes, periodos))
+
+
+def test_tabelas_sem_filtro_sao_marginais(df):
+    cubo = CuboFaturamento(df)
+    assert len(cubo.tabela('cliente', ())['valor']) == df['Cliente'].nunique()
+    assert len(cubo.tabela('restaurante', ())['valor']) == df['Restaurante'].nunique()
+    assert len(cubo.tabela('total', ())['valor']) == 1
@@ -0,0 +1,51 @@
+# Exportação Excel: os dois motores gravam as mesmas células (lidas de volta com o pandas),
+# inclusive quando as linhas atravessam vários blocos de conversão
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import faturamento
+from faturamento import ordenar_colunas, gerar_excel, MOTORES_EXCEL
+
+
+def esperado(df):
+    # O que se espera ler do arquivo: datas como datetime, números como float, o resto como texto
+    colunas = {}
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            colunas[col] = serie.astype('datetime64[ns]')
+        elif pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            colunas[col] = serie.astype('float64')
+        else:
+            colunas[col] = serie.astype(str).where(serie.notna())
+    return pd.DataFrame(colunas).reset_index(drop=True)
+
+
+def textos(serie):
+    return [None if pd.isna(v) else str(v) for v in serie]
+
+
+@pytest.mark.parametrize('df', [700], indirect=True)
+@pytest.mark.parametrize('motor', MOTORES_EXCEL)
+def test_motores_gravam_as_mesmas_celulas(df, motor, monkeypatch):
+    # 700 linhas em blocos de 256: a última conversão fica com um bloco parcial
+    monkeypatch.setattr(faturamento, 'BLOCO_EXCEL', 256)
+    df = ordenar_colunas(df)
+    lido = pd.read_excel(io.BytesIO(gerar_excel(df, motor=motor)))
+    atual = esperado(df)
+    assert list(lido.columns) == list(atual.columns)
+    for col in atual.columns:
+        if pd.api.types.is_datetime64_any_dtype(atual[col]):
+            pd.testing.assert_series_equal(lido[col].astype('datetime64[ns]'), atual[col], check_names=False)
+        elif atual[col].dtype == 'float64':
+            np.testing.assert_allclose(lido[col].astype('float64'), atual[col])
+        else:
+            assert textos(lido[col]) == textos(atual[col]), col
+
+
+def test_motor_desconhecido(df):
+    with pytest.raises(ValueError, match='motor de Excel'):
+        gerar_excel(df.head(), motor='csv')
@@ -0,0 +1,82 @@
+# FonteMultipla: os blocos de cada fonte saem à medida que chegam, alinhados à união das
+# colunas de todas as fontes, e erros de leitura chegam a quem consome
+import threading
+
+import pandas as pd
+import pytest
+
+from faturamento import FonteMultipla
+
+ESPERA = 10
+
+
+class FonteFalsa:
+    # Entrega os blocos dados; com 'segurar', para antes do segundo bloco até o evento ser liberado
+    def __init__(self, blocos, segurar=None, erro=None):
+        self.blocos = blocos
+        self.segurar = segurar
+        self.erro = erro
+        self.lidos = 0
+
+    def ler_blocos(self, tamanho_bloco):
+        for i, bloco in enumerate(self.blocos):
+            if i == 1 and self.segurar is not None:
+                assert self.segurar.wait(ESPERA)
+            self.lidos += 1
+            yield bloco.copy()
+        if self.erro is not None:
+            raise self.erro
+
+
+def test_colunas_alinhadas_e_origem(tmp_path):
+    a = pd.DataFrame({'Cliente': ['A', 'B'], ' Prazo ': ['30 dias', '28 dias'], 'Data_Vencimento': ['01/01/2025', '02/01/2025']})
+    b = pd.DataFrame({'Cliente': ['C'], 'Data _Vencimento': ['03/01/2025'], 'Carteira': ['Boleto']})
+    a.to_csv(tmp_path / 'a.csv', index=False)
+    b.to_csv(tmp_path / 'b.csv', index=False)
+
+    blocos = list(FonteMultipla({'Unidade A': str(tmp_path / 'a.csv'), 'Unidade B': str(tmp_path / 'b.csv')}).ler_blocos(1))
+
+    assert len(blocos) == 3
+    assert all(list(bloco.columns) == ['Origem', 'Cliente', 'Prazo', 'Data _Vencimento', 'Carteira'] for bloco in blocos)
+    df = pd.concat(blocos, ignore_index=True).sort_values('Cliente', ignore_index=True)
+    assert df['Origem'].tolist() == ['Unidade A', 'Unidade A', 'Unidade B']
+    assert df['Data _Vencimento'].tolist() == ['01/01/2025', '02/01/2025', '03/01/2025']
+    assert df['Prazo'].isna().tolist() == [False, False, True]
+    assert df['Carteira'].isna().tolist() == [True, True, False]
+
+
+def test_blocos_saem_sem_esperar_as_outras_fontes():
+    liberar = threading.Event()
+    lenta = FonteFalsa([pd.DataFrame({'x': [1]}), pd.DataFrame({'x': [2]})], segurar=liberar)
+    rapida = FonteFalsa([pd.DataFrame({'x': [10 + i], 'y': [i]}) for i in range(3)])
+    blocos = FonteMultipla({'lenta': lenta, 'rapida': rapida}).ler_blocos(1)
+    try:
+        # Com a fonte lenta parada no segundo bloco, já saem o primeiro dela e todos os da rápida
+        recebidos = [next(blocos) for _ in range(4)]
+        assert lenta.lidos == 1
+        assert sorted(b['x'].iloc[0] for b in recebidos) == [1, 10, 11, 12]
+        assert all(list(b.columns) == ['Origem', 'x', 'y'] for b in recebidos)
+    finally:
+        liberar.set()
+    assert [b['x'].iloc[0] for b in blocos] == [2]
+
+
+def test_erro_de_uma_fonte_interrompe_a_leitura():
+    com_erro = FonteFalsa([pd.DataFrame({'x': [1]})], erro=OSError('planilha indisponível'))
+    boa = FonteFalsa([pd.DataFrame({'x': [2]})])
+    with pytest.raises(OSError, match='planilha indisponível'):
+        list(FonteMultipla({'com erro': com_erro, 'boa': boa}).ler_blocos(1))
+
+
+def test_leitura_interrompida_para_as_threads():
+    liberar = threading.Event()
+    fontes = {'a': FonteFalsa([pd.DataFrame({'x': [i]}) for i in range(50)]),
+              'b': FonteFalsa([pd.DataFrame({'x': [1]}), pd.DataFrame({'x': [2]})], segurar=liberar)}
+    blocos = FonteMultipla(fontes).ler_blocos(1)
+    next(blocos)
+    blocos.close()
+    liberar.set()
+    for thread in [t for t in threading.enumerate() if t.name.startswith('fonte')]:
+        thread.join(ESPERA)
+        assert not thread.is_alive()
+    assert fontes['a'].lidos < 50
@@ -0,0 +1,47 @@
+# Formatação brasileira: paridade com a cadeia f-string/replace original, valores únicos e
+# colunas, vazios e não finitos
+import numpy as np
+import pandas as pd
+import pytest
+
+from formatacao import formatar_moeda, formatar_data, formatar_dias
+
+
+def moeda_original(x):
+    return f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def test_moeda_paridade_com_f_string():
+    valores = np.random.default_rng(0).normal(0, 1e6, 20_000).round(3)
+    valores = np.concatenate([valores, [0.0, -0.0, 0.005, 0.015, 999.995, 1e15, -1234567.891]])
+    esperado = [moeda_original(x) for x in valores]
+    assert formatar_moeda(pd.Series(valores)).tolist() == esperado
+    assert [formatar_moeda(x) for x in valores] == esperado
+
+
+@pytest.mark.parametrize('valor', [None, np.nan, pd.NA, np.inf, -np.inf, 'abc'])
+def test_moeda_vazios_e_nao_finitos(valor):
+    assert formatar_moeda(valor) == ''
+    assert formatar_moeda(pd.Series([1.0, valor], dtype=object)).tolist() == ['R$ 1,00', '']
+
+
+def test_moeda_preserva_indice_e_tipos():
+    serie = pd.Series([1234, None], index=[7, 3], dtype='Int64')
+    texto = formatar_moeda(serie)
+    assert texto.to_dict() == {7: 'R$ 1.234,00', 3: ''}
+    assert formatar_moeda(pd.Series([], dtype=float)).empty
+    assert formatar_moeda(np.int64(5)) == 'R$ 5,00'
+    assert formatar_moeda('12.5') == 'R$ 12,50'
+
+
+def test_dias():
+    serie = pd.Series([1, -1, 0, 30, 2.6, None, np.inf])
+    assert formatar_dias(serie).tolist() == ['1 dia', '-1 dia', '0 dias', '30 dias', '3 dias', '', '']
+    assert formatar_dias(pd.Series([5, None], dtype='Int16')).tolist() == ['5 dias', '']
+    assert [formatar_dias(x) for x in (1, 30, 2.6, None, np.nan)] == ['1 dia', '30 dias', '3 dias', '', '']
+
+
+def test_data():
+    serie = pd.Series(pd.to_datetime(['2024-02-29', None]))
+    assert formatar_data(serie).tolist() == ['29/02/2024', '']
+    assert formatar_data(pd.Timestamp('2025-01-04')) == '04/01/2025'
@@ -0,0 +1,86 @@
+# Relatórios em lote: zip com um arquivo por grupo (processos 'spawn'), poucos grupos em
+# trânsito por vez e cancelamento sem esperar os grupos que já estão rodando
+import concurrent.futures
+import io
+import threading
+import time
+import zipfile
+
+import faturamento
+from faturamento import GeradorLote
+
+
+def test_um_arquivo_por_grupo(df):
+    lote = GeradorLote(df, 'Restaurante', ('xlsx',), max_workers=2)
+    lote.executar()
+    assert lote.erro is None and lote.finalizado and not lote.cancelado
+    nomes = zipfile.ZipFile(io.BytesIO(lote.resultado)).namelist()
+    esperados = sorted(f"{faturamento.nome_arquivo(r)}.xlsx" for r in df['Restaurante'].dropna().unique())
+    assert sorted(nomes) == esperados
+    assert lote.concluidos == lote.total == len(esperados)
+
+
+class PoolFalso:
+    # Substitui o ProcessPoolExecutor: roda os grupos em threads que só terminam quando o teste
+    # libera, e registra quantos grupos estiveram em trânsito ao mesmo tempo
+    def __init__(self, max_workers, mp_context):
+        PoolFalso.atual = self
+        self.contexto = mp_context.get_start_method()
+        self.liberar = threading.Event()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.em_transito = 0
+        self.maximo = 0
+        self.shutdown_wait = None
+        self._lock = threading.Lock()
+
+    def submit(self, funcao, *args):
+        with self._lock:
+            self.em_transito += 1
+            self.maximo = max(self.maximo, self.em_transito)
+
+        def rodar():
+            self.liberar.wait()
+            try:
+                return funcao(*args)
+            finally:
+                with self._lock:
+                    self.em_transito -= 1
+        return self.executor.submit(rodar)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdown_wait = wait
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+def executar_com_pool_falso(df, monkeypatch, acao):
+    # Roda o lote em outra thread com o PoolFalso; 'acao' age com os grupos ainda bloqueados
+    monkeypatch.setattr(concurrent.futures, 'ProcessPoolExecutor', PoolFalso)
+    lote = GeradorLote(df, 'Cliente', ('xlsx',), max_workers=2)
+    thread = threading.Thread(target=lote.executar, daemon=True)
+    thread.start()
+    time.sleep(0.2)
+    try:
+        acao(lote, PoolFalso.atual)
+    finally:
+        PoolFalso.atual.liberar.set()
+    thread.join(30)
+    assert not thread.is_alive()
+    return lote, PoolFalso.atual
+
+
+def test_poucos_grupos_em_transito(df, monkeypatch):
+    def conferir(lote, pool):
+        assert pool.contexto == 'spawn'
+        assert pool.maximo == 4 < lote.total
+    lote, pool = executar_com_pool_falso(df, monkeypatch, conferir)
+    assert lote.erro is None and lote.concluidos == lote.total
+    assert pool.maximo == 4 and pool.shutdown_wait is True
+
+
+def test_cancelar_nao_espera_grupos_rodando(df, monkeypatch):
+    def cancelar(lote, pool):
+        lote.cancelar()
+        assert lote._fim.wait(5), "cancelar() ficou esperando os grupos em andamento"
+    lote, pool = executar_com_pool_falso(df, monkeypatch, cancelar)
+    assert lote.cancelado and lote.resultado is None and lote.concluidos == 0
+    assert pool.shutdown_wait is False
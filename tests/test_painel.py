@@ -0,0 +1,26 @@
+# Painel (Streamlit AppTest): a execução 'painel' é fechada mesmo quando o script para no meio
+import os
+
+import pytest
+
+import desempenho
+import faturamento
+
+streamlit_testing = pytest.importorskip('streamlit.testing.v1')
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dashboard.py')
+
+
+def test_execucao_fechada_quando_o_script_para(tmp_path, monkeypatch):
+    # Sem planilha o painel mostra o erro e chama st.stop() antes do fim do script
+    monkeypatch.setattr(faturamento, 'FONTE_PLANILHA', str(tmp_path / 'nao_existe.csv'))
+    monkeypatch.setattr(faturamento, 'PASTA_CACHE', str(tmp_path / 'cache'))
+    monkeypatch.setattr(faturamento, 'ESPERA_INICIAL_TENTATIVA', 0)
+    desempenho.ULTIMAS_EXECUCOES.pop('painel', None)
+
+    at = streamlit_testing.AppTest.from_file(DASHBOARD, default_timeout=60).run()
+
+    assert not at.exception
+    assert any('Erro ao ler a planilha' in e.value for e in at.error)
+    execucao = desempenho.ULTIMAS_EXECUCOES.get('painel')
+    assert execucao is not None and execucao.duracao_ms is not None
@@ -0,0 +1,22 @@
+# PDF profissional: sem buffer devolve os bytes; com buffer o fpdf grava direto nele
+import io
+
+from faturamento import gerar_pdf_profissional
+
+
+def test_sem_buffer_devolve_bytes(df):
+    conteudo = gerar_pdf_profissional(df)
+    assert isinstance(conteudo, bytes)
+    assert conteudo.startswith(b'%PDF') and conteudo.rstrip().endswith(b'%%EOF')
+
+
+def test_grava_direto_no_buffer(df, tmp_path):
+    buffer = io.BytesIO(b'inicio:')
+    buffer.seek(0, io.SEEK_END)
+    assert gerar_pdf_profissional(df, buffer=buffer) is buffer
+    assert buffer.getvalue().startswith(b'inicio:%PDF')
+
+    caminho = tmp_path / 'relatorio.pdf'
+    with open(caminho, 'wb') as arquivo:
+        gerar_pdf_profissional(df, buffer=arquivo)
+    assert len(caminho.read_bytes()) == len(gerar_pdf_profissional(df))
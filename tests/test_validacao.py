@@ -0,0 +1,80 @@
+# Paridade da coluna 'Validação' vetorizada (processar_dados) com o classificador linha a
+# linha original do dashboard.py, aplicado com df.apply(..., axis=1)
+import datetime
+
+import pandas as pd
+import pytest
+
+from faturamento import processar_dados, coluna_vencimento
+from gerar_dados import gerar_planilha
+
+
+def classificar_validacao_original(row, col_vencimento):
+    carteira = str(row.get('Carteira', '')).strip()
+    if carteira == 'Sem Funcionamento':
+        return '🚫 Sem Funcionamento'
+
+    fim_med = row.get('Fim_Medição')
+    encerrada = str(row.get('Medição_Encerrada', '')).strip()
+    hoje = pd.Timestamp.today()
+
+    if (pd.notna(fim_med) and hoje < fim_med) or (encerrada.lower() == 'ok'):
+        return '⏳ Aguardando encerramento'
+
+    dt_fat = row.get('Data_Faturamento')
+    dt_venc = row.get(col_vencimento)
+    valor = row.get('Valor_Faturamento', 0.0)
+
+    carteira_preenchida = carteira not in ['Não Informado', '', 'nan', 'None']
+    fat_preenchido = pd.notna(dt_fat)
+    venc_preenchido = pd.notna(dt_venc)
+    valor_preenchido = valor > 0.0
+
+    if fat_preenchido and venc_preenchido and valor_preenchido and carteira_preenchida:
+        return '✅ Concluído'
+    else:
+        return '⚠️ Pendente'
+
+
+def comparar(bruto):
+    df = processar_dados(bruto.copy())
+    col_vencimento = coluna_vencimento(df)
+    esperado = df.apply(classificar_validacao_original, axis=1, args=(col_vencimento,))
+    divergentes = pd.DataFrame({'Validação': df['Validação'], 'Original': esperado})[df['Validação'] != esperado]
+    assert divergentes.empty, divergentes.head(20).to_string()
+    return df
+
+
+@pytest.mark.parametrize('semente', [0, 1, 2])
+def test_paridade_planilha_sintetica(semente):
+    # Início 18 meses atrás: parte das medições ainda está aberta (Fim_Medição no futuro)
+    inicio = (datetime.date.today() - datetime.timedelta(days=540)).isoformat()
+    df = comparar(gerar_planilha(5_000, semente=semente, inicio=inicio, meses=24))
+    assert set(df['Validação']) == {'🚫 Sem Funcionamento', '⏳ Aguardando encerramento', '✅ Concluído', '⚠️ Pendente'}
+
+
+def test_paridade_casos_limite():
+    futuro = (datetime.date.today() + datetime.timedelta(days=10)).strftime('%d/%m/%Y')
+    bruto = pd.DataFrame({
+        'Carteira': ['Sem Funcionamento', 'Boleto', 'Boleto', None, 'nan', 'Pix', ' Pix ', 'Sem Funcionamento', 'Boleto'],
+        'Medição_Encerrada': ['OK', 'ok', None, 'Não', 'Não', 'Não', 'Não', None, ' OK '],
+        'Fim_Medição': ['01/01/2024', '01/01/2024', futuro, '01/01/2024', '01/01/2024', 'inválida', '01/01/2024', futuro, None],
+        'Data_Faturamento': ['05/01/2024', '05/01/2024', '05/01/2024', '05/01/2024', '05/01/2024', '05/01/2024', None, None, '05/01/2024'],
+        'Data _Vencimento': ['05/02/2024', '05/02/2024', '05/02/2024', '05/02/2024', '05/02/2024', '05/02/2024', '05/02/2024', None, '05/02/2024'],
+        'Valor_Faturamento': ['R$ 10,00', 'R$ 10,00', 'R$ 10,00', 'R$ 10,00', 'R$ 10,00', 'R$ 0,00', 'R$ 10,00', None, 'abc'],
+    })
+    df = comparar(bruto)
+    assert list(df['Validação']) == [
+        '🚫 Sem Funcionamento', '⏳ Aguardando encerramento', '⏳ Aguardando encerramento',
+        '⚠️ Pendente', '⚠️ Pendente', '⚠️ Pendente', '⚠️ Pendente', '🚫 Sem Funcionamento',
+        '⏳ Aguardando encerramento',
+    ]
+
+
+def test_paridade_sem_colunas_opcionais():
+    bruto = pd.DataFrame({
+        'Data_Vencimento': ['05/02/2024', None],
+        'Data_Faturamento': ['05/01/2024', '05/01/2024'],
+        'Valor_Faturamento': ['R$ 10,00', 'R$ 10,00'],
+    })
+    comparar(bruto)
@@ -0,0 +1,156 @@
+# Regras da 'Validação do Vencimento': cada caso confere o rótulo esperado e a paridade com a
+# função linha a linha original do dashboard.py (df.apply(validar_vencimento, axis=1))
+import calendar
+import re
+
+import pandas as pd
+import pytest
+
+from faturamento import processar_dados, coluna_vencimento
+from gerar_dados import gerar_planilha
+
+
+def validar_vencimento_original(row, col_vencimento):
+    venc_real = row.get(col_vencimento)
+    dt_fat = row.get('Data_Faturamento')
+    fim_med = row.get('Fim_Medição')
+    inicio_med = row.get('Inicio_Medição')
+    prazo_raw = row.get('Prazo')
+    dia_texto = str(row.get('Dia', '')).strip().lower()
+
+    if dia_texto in ['', 'nan', 'none', 'não informado']:
+        return '➖ Não Avaliado'
+
+    if pd.notna(venc_real) and pd.notna(dt_fat) and pd.notna(prazo_raw):
+        try:
+            prazo_match = re.search(r'(\d+)', str(prazo_raw))
+            if prazo_match:
+                prazo_dias_limite = int(prazo_match.group(1))
+                prazo_real_executado = (venc_real - dt_fat).days
+                if prazo_real_executado < prazo_dias_limite:
+                    return '🚀 Antecipado'
+        except:
+            pass
+
+    if "antecipado" in dia_texto:
+        if pd.isna(dt_fat) or pd.isna(inicio_med):
+            return '➖ Não Avaliado'
+        return '🚀 Antecipado' if dt_fat < inicio_med else '❌ Não Antecipado'
+
+    dias_semana = {'segunda': 0, 'terça': 1, 'terca': 1, 'quarta': 2, 'quinta': 3, 'sexta': 4, 'sábado': 5, 'sabado': 5, 'domingo': 6}
+    for nome_dia, num_dia in dias_semana.items():
+        if nome_dia in dia_texto:
+            if pd.isna(venc_real): return '➖ Não Avaliado'
+            return '✅ Dentro do Prazo' if venc_real.weekday() == num_dia else '❌ Depois do Prazo'
+
+    match = re.search(r'(\d+)', dia_texto)
+    if not match: return '➖ Não Avaliado'
+    numero_dia = int(match.group(1))
+
+    if numero_dia == 0:
+        fat_venc = (venc_real - dt_fat).days if pd.notna(venc_real) and pd.notna(dt_fat) else None
+        if fat_venc is None or pd.isna(prazo_raw): return '➖ Não Avaliado'
+        p_match = re.search(r'(\d+)', str(prazo_raw))
+        if p_match:
+            return '✅ Dentro do Prazo' if int(fat_venc) == int(p_match.group(1)) else '❌ Depois do Prazo'
+        return '➖ Não Avaliado'
+
+    if pd.isna(venc_real) or pd.isna(fim_med): return '➖ Não Avaliado'
+
+    dia_alvo = numero_dia
+    mes_alvo = fim_med.month
+    ano_alvo = fim_med.year
+
+    if dia_alvo <= fim_med.day:
+        mes_alvo += 1
+        if mes_alvo > 12:
+            mes_alvo = 1; ano_alvo += 1
+
+    try:
+        ultimo_dia_mes = calendar.monthrange(ano_alvo, mes_alvo)[1]
+        data_alvo = pd.Timestamp(year=ano_alvo, month=mes_alvo, day=min(dia_alvo, ultimo_dia_mes))
+        v_date = venc_real.date()
+        a_date = data_alvo.date()
+        if v_date == a_date: return '✅ Dentro do Prazo'
+        elif v_date > a_date: return '❌ Depois do Prazo'
+        else: return '🚀 Antecipado'
+    except:
+        return '➖ Erro no Cálculo'
+
+
+def linha(dia, prazo=None, inicio='01/11/2024', fim='30/11/2024', faturamento='05/12/2024', vencimento='04/01/2025'):
+    return {'Inicio_Medição': inicio, 'Fim_Medição': fim, 'Data_Faturamento': faturamento,
+            'Data _Vencimento': vencimento, 'Prazo': prazo, 'Dia': dia}
+
+
+def validar(bruto):
+    df = processar_dados(bruto.copy())
+    esperado = df.apply(validar_vencimento_original, axis=1, args=(coluna_vencimento(df),))
+    divergentes = pd.DataFrame({'Vetorizado': df['Validação do Vencimento'], 'Original': esperado})[df['Validação do Vencimento'] != esperado]
+    assert divergentes.empty, pd.concat([bruto, divergentes], axis=1, join='inner').to_string()
+    return list(df['Validação do Vencimento'])
+
+
+CASOS = {
+    # Texto "antecipado" em Dia: compara o faturamento com o início da medição
+    'antecipado, faturado antes do início': (linha('Antecipado', faturamento='25/10/2024'), '🚀 Antecipado'),
+    'antecipado, faturado depois do início': (linha('ANTECIPADO'), '❌ Não Antecipado'),
+    'antecipado, sem início da medição': (linha('antecipado', inicio=None), '➖ Não Avaliado'),
+    'antecipado, sem faturamento': (linha('Pagamento antecipado', faturamento=None), '➖ Não Avaliado'),
+    # Prazo cumprido em menos dias que o combinado vale antes de qualquer regra de Dia
+    'prazo menor que o combinado': (linha('Segunda-feira', prazo='45 dias'), '🚀 Antecipado'),
+    'prazo sem número é ignorado': (linha('Antecipado', prazo='Antecipado'), '❌ Não Antecipado'),
+    # Dia 0: o vencimento deve cair exatamente Prazo dias após o faturamento
+    'dia 0 com prazo cumprido': (linha('0', prazo='30 dias'), '✅ Dentro do Prazo'),
+    'dia 0 com prazo estourado': (linha('0', prazo='28 dias'), '❌ Depois do Prazo'),
+    'dia 0 sem prazo': (linha('0'), '➖ Não Avaliado'),
+    'dia 0 com prazo sem número': (linha('0', prazo='a combinar'), '➖ Não Avaliado'),
+    'dia 0 sem vencimento': (linha('0', prazo='30 dias', vencimento=None), '➖ Não Avaliado'),
+    # Dias da semana (com e sem acento, com sufixo "-feira"); 04/01/2025 é sábado
+    'sábado no dia certo': (linha('Sábado'), '✅ Dentro do Prazo'),
+    'sabado sem acento': (linha('sabado'), '✅ Dentro do Prazo'),
+    'terça no dia errado': (linha('Terça-feira'), '❌ Depois do Prazo'),
+    'terca sem acento no dia certo': (linha('terca', vencimento='07/01/2025'), '✅ Dentro do Prazo'),
+    'domingo sem vencimento': (linha('Domingo', vencimento=None), '➖ Não Avaliado'),
+    'primeiro dia citado vale': (linha('Quarta ou sexta', vencimento='03/01/2025'), '❌ Depois do Prazo'),
+    # Dia do mês: vence no mês seguinte ao fechamento, com virada de dezembro para janeiro
+    'virada de ano no dia': (linha('10', fim='20/12/2024', faturamento='22/12/2024', vencimento='10/01/2025'), '✅ Dentro do Prazo'),
+    'virada de ano depois': (linha('10', fim='20/12/2024', faturamento='22/12/2024', vencimento='15/01/2025'), '❌ Depois do Prazo'),
+    'virada de ano antes': (linha('10', fim='20/12/2024', faturamento='22/12/2024', vencimento='05/01/2025'), '🚀 Antecipado'),
+    'dia ainda por vir no mês do fechamento': (linha('25', fim='20/12/2024', faturamento='22/12/2024', vencimento='25/12/2024'), '✅ Dentro do Prazo'),
+    'dia igual ao fechamento vai para o mês seguinte': (linha('20', fim='20/12/2024', faturamento='22/12/2024', vencimento='20/01/2025'), '✅ Dentro do Prazo'),
+    'dia 31 em fevereiro vira o último dia': (linha('dia 31', fim='31/01/2024', faturamento='01/02/2024', vencimento='29/02/2024'), '✅ Dentro do Prazo'),
+    'dia 30 em fevereiro de ano comum': (linha('30', fim='31/01/2025', faturamento='01/02/2025', vencimento='28/02/2025'), '✅ Dentro do Prazo'),
+    # Prazo e Dia ausentes, e datas vazias ou inválidas (NaT)
+    'sem dia': (linha(None, prazo='30 dias'), '➖ Não Avaliado'),
+    'dia não informado': (linha('Não Informado'), '➖ Não Avaliado'),
+    'dia em branco': (linha('  '), '➖ Não Avaliado'),
+    'dia sem número nem nome': (linha('a combinar'), '➖ Não Avaliado'),
+    'sem prazo nem dia': (linha(None), '➖ Não Avaliado'),
+    'sem fechamento': (linha('10', fim=None), '➖ Não Avaliado'),
+    'sem vencimento': (linha('10', vencimento=None), '➖ Não Avaliado'),
+    'vencimento inválido': (linha('10', vencimento='31/02/2025'), '➖ Não Avaliado'),
+    'sem faturamento com prazo': (linha('5', prazo='30 dias', faturamento=None, vencimento='05/12/2024'), '✅ Dentro do Prazo'),
+}
+
+
+@pytest.mark.parametrize('caso', list(CASOS))
+def test_regra(caso):
+    registro, esperado = CASOS[caso]
+    assert validar(pd.DataFrame([registro])) == [esperado]
+
+
+def test_todas_as_regras_juntas():
+    registros = [registro for registro, _ in CASOS.values()]
+    assert validar(pd.DataFrame(registros)) == [esperado for _, esperado in CASOS.values()]
+
+
+@pytest.mark.parametrize('semente', [0, 1, 2])
+def test_paridade_planilha_sintetica(semente):
+    rotulos = validar(gerar_planilha(5_000, semente=semente))
+    assert {'🚀 Antecipado', '❌ Não Antecipado', '✅ Dentro do Prazo', '❌ Depois do Prazo', '➖ Não Avaliado'} <= set(rotulos)
+
+
+def test_sem_coluna_prazo():
+    bruto = pd.DataFrame([linha('10'), linha('0'), linha('Antecipado')]).drop(columns='Prazo')
+    assert validar(bruto) == ['❌ Depois do Prazo', '➖ Não Avaliado', '❌ Não Antecipado']